@@ -1,9 +1,28 @@
+import gc
 import inspect
+import numbers
 import operator as op
+import sys
 import time
 
 import numpy as np
 
+import fingerprint
+
+SHAPES = ((1,), (1000,), (100, 100))
+# Opcode trace events are new in Python 3.7; before that, count lines
+COST_STEPS = 'opcodes' if sys.version_info >= (3, 7) else 'lines'
+# Allocated memory blocks are only counted on Python 3.4+;
+# before that, count allocations of gc-tracked objects
+ALLOC_UNITS = 'blocks' if hasattr(sys, 'getallocatedblocks') else 'objects'
+# The @ operator, on Python 3.5+
+matmul = getattr(op, 'matmul', np.matmul)
+# Latency percentiles reported by time_latency
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+# Each latency sample times enough calls to take this long (in ms),
+# so it's well above the clock's resolution (about 1 us for time.time)
+LATENCY_MIN_MS = 0.05
+
 
 class Timer(object):
     def __enter__(self):
@@ -16,6 +35,54 @@ class Timer(object):
         self.msecs = self.secs * 1000  # millisecs
 
 
+class LatencyHistogram(object):
+    """Counts of latencies (in ms), in log-spaced buckets.
+
+    Each decade is split into `per_decade` buckets, so percentiles are
+    only accurate to a factor of 10 ** (1 / per_decade) (12% by default).
+    """
+
+    def __init__(self, per_decade=20, min_ms=1e-5):
+        self.per_decade = per_decade
+        self.min_ms = min_ms
+        self.counts = {}
+        self.n = 0
+
+    def add(self, ms):
+        # Calls faster than the clock can measure go in the lowest bucket
+        bucket = int(np.floor(
+            np.log10(max(ms, self.min_ms)) * self.per_decade))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.n += 1
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the `q`th percentile.
+
+        NaN unless at least 10 samples are above the percentile
+        (e.g., 10,000 samples for the 99.9th).
+        """
+        if self.n < int(round(1000.0 / (100 - q))):
+            return np.nan
+        rank = q / 100.0 * self.n
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return 10 ** ((bucket + 1.0) / self.per_decade)
+
+
+def calls_per_sample(func, args, min_ms=LATENCY_MIN_MS):
+    """How many calls of `func(*args)` take at least `min_ms`."""
+    n = 1
+    while True:
+        with Timer() as t:
+            for i in range(n):
+                func(*args)
+        if t.msecs >= min_ms:
+            return n
+        n *= 2
+
+
 def time_unary(ndarrays, funcs):
     with Timer() as t:
         for func in funcs:
@@ -33,6 +100,284 @@ def time_binary(left, right, funcs):
     return t.msecs
 
 
+def unary_cases(ndarrays, funcs):
+    """The (func, args) pairs called by time_unary."""
+    return [(func, (nda,)) for func in funcs for nda in ndarrays]
+
+
+def binary_cases(left, right, funcs):
+    """The (func, args) pairs called by time_binary."""
+    return [(func, (l, r)) for func in funcs for l in left for r in right]
+
+
+def max_errors(actual, expected):
+    """Largest relative error, and error in units in the last place."""
+    a = np.asarray(actual, dtype=float)
+    e = np.asarray(expected, dtype=float)
+    if a.shape != e.shape:
+        return np.inf, np.inf
+    same = (a == e) | (np.isnan(a) & np.isnan(e))
+    diff = np.abs(a - e)
+    with np.errstate(all='ignore'):
+        rel = np.where(same, 0.0, diff / np.abs(e))
+        ulp = np.where(same, 0.0, diff / np.spacing(np.abs(e)))
+    # NaN where only one is NaN, or both are inf but different
+    rel[np.isnan(rel)] = np.inf
+    ulp[np.isnan(ulp)] = np.inf
+    return np.max(rel, initial=0.0), np.max(ulp, initial=0.0)
+
+
+def outcome(func, args):
+    """(result, None) for `func(*args)`, or (None, exception type)."""
+    try:
+        return func(*args), None
+    except Exception as e:
+        return None, type(e)
+
+
+def same_values(a, b):
+    """Whether two arrays are exactly equal, counting NaNs as equal."""
+    try:
+        a = np.asarray(a, dtype=float)
+        b = np.asarray(b, dtype=float)
+    except (TypeError, ValueError):
+        # Not numbers (e.g., strings); compare as objects
+        return bool(np.array_equal(a, b))
+    return a.shape == b.shape and bool(
+        np.all((a == b) | (np.isnan(a) & np.isnan(b))))
+
+
+def timed_ok(timing):
+    """Whether a time_func result is a real timing (not failed/timed out)."""
+    return timing[0] > 0 and tuple(timing) != (20.0, 20.0, 20.0)
+
+
+def unit_product(make, data, units, exponent=1):
+    """`data` in the product of `units`, each raised to `exponent`."""
+    q = make(data, units[0]) ** exponent
+    for u in units[1:]:
+        q = q * make(np.ones_like(data), u) ** exponent
+    return q
+
+
+def apply_ufunc_method(ufunc, method, x, y):
+    """Call `ufunc.method` on x (and y, for binary methods)."""
+    if method == 'outer':
+        return ufunc.outer(x, y)
+    elif method == 'at':
+        # Like a histogram: every other index gets two updates
+        indices = np.arange(x.shape[0]) // 2
+        return ufunc.at(x, indices, y)
+    return getattr(ufunc, method)(x)
+
+
+def time_ufunc_method(ufunc, method, x, y):
+    with Timer() as t:
+        apply_ufunc_method(ufunc, method, x, y)
+    return t.msecs
+
+
+def time_raise(left, right, func, reps=10):
+    with Timer() as t:
+        for i in range(reps):
+            try:
+                func(left, right)
+            except Exception:
+                pass
+    return t.msecs
+
+
+def collect():
+    """Collect garbage before measuring, without GCMonitor counting it."""
+    GCMonitor.ignore += 1
+    try:
+        gc.collect()
+    finally:
+        GCMonitor.ignore -= 1
+
+
+def count_objects(func, *args):
+    """Count the gc-tracked objects kept alive by the result of a call."""
+    enabled = gc.isenabled()
+    collect()
+    gc.disable()
+    try:
+        before = len(gc.get_objects())
+        result = func(*args)
+        after = len(gc.get_objects())
+    finally:
+        if enabled:
+            gc.enable()
+    # Don't count the container that holds the result
+    return after - before - gc.is_tracked(result)
+
+
+def _allocated():
+    """Running count of allocations, in ALLOC_UNITS, net of frees."""
+    if ALLOC_UNITS == 'blocks':
+        return sys.getallocatedblocks()
+    # Goes up with each gc-tracked allocation, down with each free,
+    # and is only reset by a collection
+    return gc.get_count()[0]
+
+
+def _count_allocated(func, *args):
+    allocated = {'last': 0, 'total': 0}
+
+    def check():
+        now = _allocated()
+        allocated['total'] += max(now - allocated['last'], 0)
+        allocated['last'] = now
+
+    def profile(frame, event, arg):
+        check()
+
+    enabled = gc.isenabled()
+    collect()
+    gc.disable()
+    try:
+        allocated['last'] = _allocated()
+        sys.setprofile(profile)
+        try:
+            func(*args)
+        finally:
+            sys.setprofile(None)
+        check()
+    finally:
+        if enabled:
+            gc.enable()
+    return allocated['total']
+
+
+def count_allocations(func, *args):
+    """Count the memory blocks (see ALLOC_UNITS) allocated during a call.
+
+    This includes short-lived temporaries, not just what the call leaves
+    allocated. The count is checked at every Python and C call and return,
+    so anything allocated and freed inside one C call is missed. What the
+    profiling itself allocates is measured by calling a function that
+    does nothing, and subtracted.
+    """
+    count = _count_allocated(func, *args)
+    return max(count - _count_allocated(lambda *args: None, *args), 0)
+
+
+class GCMonitor(object):
+    """Count garbage collections, by generation, and time spent in them.
+
+    Uses `gc.callbacks` on Python 3.3+. Before that, the collector's
+    DEBUG_STATS messages are read from sys.stderr (see GCStatsStream).
+    """
+
+    # Non-zero while `collect` runs
+    ignore = 0
+
+    def __enter__(self):
+        self.collections = [0, 0, 0]
+        self.pause = 0.0
+        self._start = None
+        self._generation = None
+        if hasattr(gc, 'callbacks'):
+            gc.callbacks.append(self._callback)
+        else:
+            self._debug = gc.get_debug()
+            self._stderr = sys.stderr
+            gc.set_debug(self._debug | gc.DEBUG_STATS)
+            sys.stderr = GCStatsStream(self, self._stderr)
+        return self
+
+    def __exit__(self, *args):
+        if hasattr(gc, 'callbacks'):
+            gc.callbacks.remove(self._callback)
+        else:
+            sys.stderr = self._stderr
+            gc.set_debug(self._debug)
+
+    def _callback(self, phase, info):
+        if GCMonitor.ignore:
+            return
+        if phase == 'start':
+            self._start = time.time()
+            self._generation = info['generation']
+        elif self._start is not None:
+            self.collections[self._generation] += 1
+            self.pause += time.time() - self._start
+            self._start = None
+
+    def stats(self):
+        return {'collections_0': self.collections[0],
+                'collections_1': self.collections[1],
+                'collections_2': self.collections[2],
+                'pause_ms': self.pause * 1000}
+
+
+class GCStatsStream(object):
+    """Stands in for sys.stderr, to see when collections start and stop.
+
+    The collector's DEBUG_STATS messages are passed to `monitor` rather
+    than printed; everything else goes to `stream`.
+    """
+
+    def __init__(self, monitor, stream):
+        self.monitor = monitor
+        self.stream = stream
+        # In a collection's messages, the last of which ends with '.\n'
+        self.collecting = False
+        self.done = False
+
+    def write(self, text):
+        if text.startswith('gc: collecting generation '):
+            generation = int(text.split()[3].rstrip('.'))
+            self.monitor._callback('start', {'generation': generation})
+            self.collecting, self.done = True, False
+        elif not self.collecting:
+            self.stream.write(text)
+        elif text.startswith('gc: done'):
+            self.monitor._callback('stop', {})
+            self.done = True
+            self.collecting = not text.endswith('\n')
+        elif self.done and text.endswith('\n'):
+            self.collecting = False
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def count_cost(func, *args):
+    """Count the Python calls, C calls and steps done inside a call.
+
+    Steps are bytecodes or lines (see COST_STEPS). The call to `func`
+    itself is only counted if it's a Python function.
+    """
+    counts = {'calls': 0, 'c_calls': 0, COST_STEPS: 0}
+    here = sys._getframe()
+
+    def profile(frame, event, arg):
+        if frame is here:
+            return
+        if event == 'call':
+            counts['calls'] += 1
+        elif event == 'c_call':
+            counts['c_calls'] += 1
+
+    def trace(frame, event, arg):
+        if event == 'call' and COST_STEPS == 'opcodes':
+            frame.f_trace_lines = False
+            frame.f_trace_opcodes = True
+        elif event in ('line', 'opcode'):
+            counts[COST_STEPS] += 1
+        return trace
+
+    sys.setprofile(profile)
+    sys.settrace(trace)
+    try:
+        func(*args)
+    finally:
+        sys.settrace(None)
+        sys.setprofile(None)
+    return counts
+
+
 class BenchNumpy(object):
     def __init__(self, dtype=np.float64):
         self.dtype = dtype
@@ -70,9 +415,15 @@ class BenchNumpy(object):
         ]
 
     def rand(self, shape):
+        if len(shape) == 0:
+            # A NumPy scalar, rather than a 0-d array
+            return self.dtype(10 * np.random.rand())
         return (10 * np.random.rand(*shape)).astype(self.dtype, copy=False)
 
-    def time(self, n=100):
+    def make(self, data, units):
+        return np.asarray(data, dtype=self.dtype)
+
+    def time(self, n=100, verbose=True):
         shapes = [(10,), (1000,), (100, 100)]
         time = []
         for i in range(n):
@@ -92,11 +443,82 @@ class BenchNumpy(object):
             time.sort()
             time = np.asarray(time[2:-2])
 
-        print "{:.3f} +/- {:.2f} ms".format(np.mean(time), np.std(time))
+        if verbose:
+            print "{:.3f} +/- {:.2f} ms".format(np.mean(time), np.std(time))
         return time
 
+    def calibrate(self, n=100):
+        """How long this machine takes for time()'s workload, in ms."""
+        return float(np.mean(self.time(n, verbose=False)))
+
 
 class BenchModule(object):
+    # (speed result key, timing method) pairs measured by time()
+    speed_funcs = [
+        ('make', 'time_make'),
+        ('ops', 'time_ops'),
+        ('ufunc', 'time_ufuncs'),
+    ]
+    indexing_funcs = [
+        ('slice', 'time_slice'),
+        ('mask', 'time_mask'),
+        ('gather', 'time_gather'),
+        ('scatter', 'time_scatter'),
+    ]
+    iteration_funcs = [
+        ('for', 'time_iterate'),
+        ('list', 'time_list'),
+        ('tolist', 'time_tolist'),
+    ]
+    ufunc_methods = ['reduce', 'accumulate', 'outer', 'at']
+    construct_kinds = ['ndarray', 'list', 'scalar', 'quantity']
+    # (label, unit string) pairs
+    construct_units = [
+        ('m', 'm'),
+        ('km', 'km'),
+        ('mN', 'mN'),
+        ('compound', 'kg*m/s**2'),
+    ]
+    # Formulas over six operands in meters, timed on large arrays
+    formulas = [
+        ('axpy', lambda a, b, c, d, e, f: a * 2.5 + b),
+        ('sum_products', lambda a, b, c, d, e, f: a * b + c * d - e * f),
+        ('ratio', lambda a, b, c, d, e, f: (a + b) * (c - d) / (e + f)),
+    ]
+    formula_shapes = ((10000,), (1000000,))
+    # Units multiplied together for time_complexity
+    complexity_bases = ['m', 'kg', 's', 'A', 'K', 'mol', 'cd', 'rad', 'sr']
+    # Lengths, so only the names grow; the most widely supported first
+    complexity_names = ['m', 'km', 'mm', 'cm', 'um', 'nm', 'inch', 'ft',
+                        'mile']
+    # Numbers of synthetic units to register for time_registry
+    registry_sizes = (10, 1000, 10000, 100000)
+    # (label, function) pairs timed by time_formatting
+    format_funcs = [('str', str), ('repr', repr), ('format', format)]
+    # (label, shape) of the quantities formatted; None is a Python float
+    format_shapes = [('scalar', None), ('array', (100,))]
+    # Shapes timed call by call for time_latency; () is a NumPy scalar
+    latency_shapes = ((), (1,))
+    # Array functions beyond ufuncs, called with quantities in m and s,
+    # and something with the units their result should have
+    array_funcs = [
+        ('dot', lambda x, y: np.dot(x, y), lambda x, y: x * y),
+        ('matmul', lambda x, y: matmul(x, y), lambda x, y: x * y),
+        ('einsum', lambda x, y: np.einsum('ij,jk->ik', x, y),
+         lambda x, y: x * y),
+        ('solve', lambda x, y: np.linalg.solve(x, y), lambda x, y: y / x),
+        ('cumsum', lambda x, y: np.cumsum(x, axis=-1), lambda x, y: x),
+        ('gradient', lambda x, y: np.gradient(x, axis=-1), lambda x, y: x),
+        ('trapz', lambda x, y: np.trapz(x, axis=-1), lambda x, y: x),
+        ('rfft', lambda x, y: np.fft.rfft(x, axis=-1), lambda x, y: x),
+    ]
+    # Sizes of the (n, n) arrays for time_array_funcs
+    array_sizes = (10, 100, 300)
+    # Names of the suites to run; None runs all of them
+    only_suites = None
+    # A samples.SampleStore to record every timing sample in, if any
+    samples = None
+
     def __init__(self, np_obj):
         self.np_obj = np_obj
         self.unary_ops = [
@@ -116,6 +538,14 @@ class BenchModule(object):
         self.binary_different_ufuncs = [
             o for o in np_obj.binary_ufuncs if self.test_binary_different(o)]
         self.other_numpy = self.test_other_numpy()
+        self.ufunc_method_funcs = {}
+        for method in self.ufunc_methods:
+            self.ufunc_method_funcs[method] = [
+                o for o in np_obj.binary_ufuncs
+                if self.test_ufunc_method(o, method)]
+        self.array_func_units = {}
+        for name, func, units in self.array_funcs:
+            self.array_func_units[name] = self.test_array_func(func, units)
 
     ## Helpers
 
@@ -163,6 +593,73 @@ class BenchModule(object):
             return False
         return True
 
+    def test_ufunc_method(self, ufunc, method):
+        x = self.make(self.rand(shape=(4,)), units='m')
+        y = self.make(self.rand(shape=(4,)), units='m')
+        if method == 'accumulate' and np.asarray(x).dtype == object:
+            # Accumulating object arrays into bools crashes NumPy
+            loops = [t for t in ufunc.types if t.startswith('OO')]
+            if len(loops) > 0 and not loops[0].endswith('O'):
+                return False
+        try:
+            # Must give the same values as NumPy on the magnitudes
+            expected = np.array(self.magnitude(x), dtype=float)
+            res = apply_ufunc_method(ufunc, method, expected, self.magnitude(y))
+            if method != 'at':
+                expected = res
+            res = apply_ufunc_method(ufunc, method, x, y)
+            if method == 'at':
+                # Must update x in place, not a copy
+                res = x
+            try:
+                res = self.magnitude(res)
+            except Exception:
+                # Not a quantity (e.g., a bool array)
+                pass
+            res = np.asarray(res, dtype=float)
+            return res.shape == expected.shape and bool(
+                np.allclose(res, expected, equal_nan=True))
+        except:
+            return False
+
+    def test_array_func(self, func, units):
+        """Whether `func` propagates, drops, rejects or gets units wrong.
+
+        Units are wrong if, on operands in km and h, the result doesn't
+        have the same dimensions as `units` (a function of the operands),
+        or if (so that wrong scales show up too) its values in SI units
+        differ from NumPy's on the operands in SI units. What can't be
+        checked (e.g., without `to_si`) counts as propagated.
+        """
+        x = self.make(self.rand(shape=(4, 4)), units='m')
+        y = self.make(self.rand(shape=(4, 4)), units='s')
+        try:
+            res = func(x, y)
+        except:
+            return 'rejected'
+        if not self.has_units(res):
+            return 'dropped'
+
+        try:
+            x = self.make(self.rand(shape=(4, 4)), units='km')
+            y = self.make(self.rand(shape=(4, 4)), units='h')
+            res = func(x, y)
+            same = self.same_dimensions(res, units(x, y))
+        except Exception:
+            # Can't check (e.g., the package lacks km or h)
+            return 'propagated'
+        if not same:
+            return 'wrong'
+        try:
+            expected = func(self.to_si(x), self.to_si(y))
+            actual = self.to_si(res)
+        except Exception:
+            # E.g., no to_si
+            return 'propagated'
+        if np.allclose(np.asarray(actual, dtype=float), expected, rtol=1e-6):
+            return 'propagated'
+        return 'wrong'
+
     def test_other_numpy(self):
         # For each, if it works we add it
         good = []
@@ -233,6 +730,12 @@ class BenchModule(object):
                 args.append(shape)
                 continue
 
+            if arg == 'make':
+                # Constructors; NumPy just makes an array from the data
+                np_args.append(self.np_obj.make)
+                args.append(self.make)
+                continue
+
             ndarray = self.rand(shape)
             if arg.startswith('neg'):
                 ndarray *= -1
@@ -249,23 +752,41 @@ class BenchModule(object):
 
         return tuple(np_args), tuple(args)
 
-    def time_func(self, func, shapes=((1,), (1000,), (100, 100)),
-                  iters=50, timeout=2000.0, verbose=False):
+    def sample_func(self, func, shape, argspec=None):
+        if argspec is None:
+            argspec = inspect.getargspec(func)
+        np_args, args = self.make_args(argspec, shape)
+        try:
+            np_time = func(*np_args)
+        except:
+            np_time = np.inf
+        return np_time, func(*args)
+
+    def time_func(self, func, shapes=SHAPES, iters=50, timeout=2000.0,
+                  verbose=False, histogram=None, key=None):
+        """Time `func` on each of `shapes`, `iters` times.
+
+        `key` (by default, the name of `func`) labels the samples saved
+        in `self.samples`, so it should be the key of the result.
+        """
+        if key is None:
+            key = func.__name__
         np_time = []
         time = []
         argspec = inspect.getargspec(func)
 
         for i in range(iters):
             for shape in shapes:
-                np_args, args = self.make_args(argspec, shape)
-                try:
-                    np_time.append(func(*np_args))
-                except:
-                    np_time.append(np.inf)
                 try:
-                    time.append(func(*args))
+                    np_t, t = self.sample_func(func, shape, argspec)
                 except Exception as e:
                     return -1, -1, -1
+                np_time.append(np_t)
+                time.append(t)
+                if self.samples is not None:
+                    self.samples.add(self.name, key, shape, t, np_t)
+                if histogram is not None:
+                    histogram.add(t)
                 if time[-1] > timeout:
                     if verbose:
                         print "{}.{} timed out".format(self.name, func.__name__)
@@ -315,6 +836,247 @@ class BenchModule(object):
                          self.binary_different_ufuncs)
         return t
 
+    def func_cases(self, kind, pos, neg_same, pos_compatible, neg_different):
+        """The calls made by time_ops (kind='ops') or time_ufuncs ('ufuncs').
+
+        Returns a list of (func, args) pairs.
+        """
+        res = unary_cases([pos, neg_same, pos_compatible, neg_different],
+                          getattr(self, 'unary_' + kind))
+        res += binary_cases([pos], [neg_same],
+                            getattr(self, 'binary_same_' + kind))
+        res += binary_cases([pos], [neg_same, pos_compatible],
+                            getattr(self, 'binary_compatible_' + kind))
+        res += binary_cases([pos], [neg_same, pos_compatible, neg_different],
+                            getattr(self, 'binary_different_' + kind))
+        return res
+
+    def same_outcome(self, a, b):
+        """Whether two outcomes (see `outcome`) are the same.
+
+        Values are compared in SI units.
+        """
+        (a_value, a_error), (b_value, b_error) = a, b
+        if a_error is not None or b_error is not None:
+            return a_error is b_error
+        try:
+            return same_values(self.to_si(a_value), self.to_si(b_value))
+        except Exception:
+            return False
+
+    def error_timer(self, func):
+        def time_error(pos, neg_different):
+            return time_raise(pos, neg_different, func)
+        time_error.__name__ = 'time_error_' + func.__name__
+        return time_error
+
+    def time_same_dimensions(self, pos, neg_different):
+        with Timer() as t:
+            for i in range(10):
+                self.same_dimensions(pos, neg_different)
+        return t.msecs
+
+    def time_slice(self, pos):
+        with Timer() as t:
+            pos[::2]
+        return t.msecs
+
+    def time_mask(self, pos, neg_same):
+        mask = pos > neg_same
+        with Timer() as t:
+            pos[mask]
+        return t.msecs
+
+    def time_gather(self, pos, shape):
+        idx = np.random.randint(shape[0], size=shape[0])
+        with Timer() as t:
+            pos[idx]
+        return t.msecs
+
+    def time_scatter(self, pos, neg_same, shape):
+        idx = np.random.randint(shape[0], size=shape[0])
+        value = neg_same[idx]
+        with Timer() as t:
+            pos[idx] = value
+        return t.msecs
+
+    def time_iterate(self, pos, shape):
+        with Timer() as t:
+            for q in pos:
+                pass
+        return t.msecs / shape[0]
+
+    def time_list(self, pos, shape):
+        with Timer() as t:
+            list(pos)
+        return t.msecs / shape[0]
+
+    def time_tolist(self, pos, shape):
+        with Timer() as t:
+            pos.tolist()
+        return t.msecs / shape[0]
+
+    def construct_timer(self, kind, units, parse=True):
+        def time_construct(make, shape):
+            if parse and make != self.np_obj.make:
+                make = self.make_from_string
+            if kind == 'ndarray':
+                data = self.rand(shape)
+            elif kind == 'list':
+                data = self.rand(shape).tolist()
+            elif kind == 'scalar':
+                data = float(self.rand((1,))[0])
+            elif kind == 'quantity':
+                data = make(self.rand(shape), units)
+                if make != self.np_obj.make:
+                    make = self.remake
+            with Timer() as t:
+                make(data, units)
+            return t.msecs
+        time_construct.__name__ = 'time_construct_{}_{}'.format(kind, units)
+        return time_construct
+
+    def format_timer(self, label, func, shape):
+        def time_format(make):
+            if shape is None:
+                q = make(float(self.rand((1,))[0]), 'm')
+            else:
+                q = make(self.rand(shape), 'm')
+            # NumPy has no best unit display to compare with
+            f = str if make == self.np_obj.make and label == 'best' else func
+            with Timer() as t:
+                f(q)
+            return t.msecs
+        time_format.__name__ = 'time_format_' + label
+        return time_format
+
+    def latency_timer(self, func, binary):
+        # Calls per sample, by the type of the arguments, as NumPy's
+        # calls need bigger batches than the package's
+        batches = {}
+
+        def time_call(pos, neg_same):
+            args = (pos, neg_same) if binary else (pos,)
+            if type(pos) not in batches:
+                batches[type(pos)] = calls_per_sample(func, args)
+            batch = batches[type(pos)]
+            with Timer() as t:
+                for i in range(batch):
+                    func(*args)
+            return t.msecs / batch
+        time_call.__name__ = 'time_call_' + func.__name__
+        return time_call
+
+    def ufunc_method_timer(self, method):
+        def time_ufunc_methods(pos, neg_same):
+            t = 0.0
+            for ufunc in self.ufunc_method_funcs[method]:
+                t += time_ufunc_method(ufunc, method, pos, neg_same)
+            return t
+        time_ufunc_methods.__name__ = 'time_ufunc_' + method
+        return time_ufunc_methods
+
+    def formula_timer(self, name, formula):
+        def time_formula(a, b, c, d, e, f):
+            with Timer() as t:
+                self.evaluate(formula(a, b, c, d, e, f))
+            return t.msecs
+        time_formula.__name__ = 'time_formula_' + name
+        return time_formula
+
+    def complexity_timer(self, units, exponent):
+        def time_complexity(make, shape):
+            x = unit_product(make, self.rand(shape), units, exponent)
+            y = unit_product(make, self.rand(shape), units, exponent)
+            with Timer() as t:
+                x * y
+                x / y
+            return t.msecs
+        time_complexity.__name__ = 'time_complexity_{}_{}'.format(
+            len(units), exponent)
+        return time_complexity
+
+    def registry_timer(self, name, func, args):
+        def time_registry():
+            with Timer() as t:
+                for arg in args:
+                    func(arg)
+            return t.msecs / len(args)
+        time_registry.__name__ = 'time_registry_' + name
+        return time_registry
+
+    def array_func_timer(self, name, func):
+        def time_array_func(pos, pos_different):
+            with Timer() as t:
+                func(pos, pos_different)
+            return t.msecs
+        time_array_func.__name__ = 'time_array_' + name
+        return time_array_func
+
+    def conversion_timer(self, kind, compatible):
+        """Time the compatible binary ops or ufuncs on m and mile (or ft),
+        or, if not `compatible`, on two quantities in m."""
+        funcs = getattr(self, 'binary_compatible_' + kind)
+
+        def time_compatible(pos, pos_compatible):
+            return time_binary([pos], [pos_compatible], funcs)
+
+        def time_same_unit(pos, pos_same):
+            return time_binary([pos], [pos_same], funcs)
+
+        if compatible:
+            return time_compatible
+        return time_same_unit
+
+    def soak_steps(self):
+        """The parts of the soak test workload that work in this package.
+
+        Each takes the iteration number and an ndarray.
+        """
+        def make(i, data):
+            self.make(data, 'm')
+
+        def ops(i, data):
+            x = self.make(data, 'm')
+            x + x
+            x * x
+
+        def convert(i, data):
+            self.make(data, 'm') + self.make(data, 'ft')
+
+        def compound(i, data):
+            # A different unit each time, for 8000 iterations
+            a, b, c = i % 20 + 1, i // 20 % 20 + 1, i // 400 % 20 + 1
+            (self.make(data, 'm') ** a * self.make(data, 's') ** -b
+             * self.make(data, 'kg') ** c)
+
+        steps = []
+        for step in [make, ops, convert, compound]:
+            try:
+                step(0, self.rand((2,)))
+            except Exception:
+                continue
+            steps.append(step)
+        return steps
+
+    def cost_cases(self):
+        """(prefix, suffix, func, args) for each op and ufunc to count."""
+        pos, neg_same, pos_compatible, neg_different = self.make_args(
+            inspect.getargspec(self.time_ops), (10,))[1]
+        cases = []
+        for kind, prefix in [('ops', 'op'), ('ufuncs', 'ufunc')]:
+            for func in getattr(self, 'unary_' + kind):
+                cases.append((prefix, '', func, (pos,)))
+            for func in getattr(self, 'binary_same_' + kind):
+                cases.append((prefix, '', func, (pos, neg_same)))
+            for func in getattr(self, 'binary_compatible_' + kind):
+                cases.append((prefix, '_compatible', func,
+                              (pos, pos_compatible)))
+            for func in getattr(self, 'binary_different_' + kind):
+                cases.append((prefix, '_different', func,
+                              (pos, neg_different)))
+        return cases
+
     ## Actual test functions that gather data
 
     def syntax(self, verbose=False):
@@ -365,15 +1127,487 @@ class BenchModule(object):
         return res
 
     def time(self, verbose=False):
-        make_mean, make_std, make_rel = self.time_func(self.time_make)
-        op_mean, op_std, op_rel = self.time_func(self.time_ops)
-        ufunc_mean, ufunc_std, ufunc_rel = self.time_func(self.time_ufuncs)
+        res = {}
+        for key, method in self.speed_funcs:
+            mean, std, rel = self.time_func(getattr(self, method), key=key)
+            res[key] = {'mean': mean, 'std': std, 'np_rel': rel}
+        return res
 
-        return {
-            'make': {'mean': make_mean, 'std': make_std, 'np_rel': make_rel},
-            'ops': {'mean': op_mean, 'std': op_std, 'np_rel': op_rel},
-            'ufunc': {'mean': ufunc_mean, 'std': ufunc_std, 'np_rel': ufunc_rel},
-        }
+    def ufunc_method_compatibility(self):
+        res = {}
+        for method in self.ufunc_methods:
+            for ufunc in self.np_obj.binary_ufuncs:
+                res['{}.{}'.format(ufunc.__name__, method)] = (
+                    ufunc in self.ufunc_method_funcs[method])
+        return {'ufunc_methods': res}
+
+    def array_func_compatibility(self):
+        return {'array_funcs': dict(self.array_func_units)}
+
+    def time_array_funcs(self):
+        """Time linear algebra, einsum, FFT and other array functions.
+
+        Each size of (n, n) array is reported separately, along with
+        whether the function propagates, drops or rejects units,
+        or gets them wrong.
+        Functions that reject units aren't timed.
+        """
+        res = {}
+        for name, func, expected in self.array_funcs:
+            units = self.array_func_units[name]
+            for n in self.array_sizes:
+                key = 'array_{}_{}'.format(name, n)
+                if units == 'rejected':
+                    mean, std, rel = -1, -1, -1
+                else:
+                    mean, std, rel = self.time_func(
+                        self.array_func_timer(name, func), shapes=((n, n),),
+                        key=key)
+                res[key] = {
+                    'mean': mean, 'std': std, 'np_rel': rel, 'units': units}
+        return res
+
+    def count_costs(self, reps=3):
+        """Count calls and steps for each op and ufunc.
+
+        Each is called once to fill any caches, then counted `reps` times,
+        keeping the smallest counts (e.g., in case of garbage collection).
+        """
+        res = {}
+        for prefix, suffix, func, args in self.cost_cases():
+            try:
+                func(*args)
+                counts = [count_cost(func, *args) for i in range(reps)]
+            except Exception:
+                continue
+            res['{}_{}{}'.format(prefix, func.__name__, suffix)] = {
+                key: min(c[key] for c in counts) for key in counts[0]}
+        return res
+
+    def count_allocs(self, reps=3):
+        """Count the blocks (or gc-tracked objects) each op and ufunc makes.
+
+        As in count_costs, each is called once first, and the smallest
+        of `reps` counts is kept.
+        """
+        res = {}
+        for prefix, suffix, func, args in self.cost_cases():
+            try:
+                func(*args)
+                count = min(count_allocations(func, *args)
+                            for i in range(reps))
+            except Exception:
+                continue
+            res['{}_{}{}'.format(prefix, func.__name__, suffix)] = {
+                ALLOC_UNITS: count}
+        return res
+
+    def time_ufunc_methods(self):
+        """Time ufunc methods over all the binary ufuncs that support them.
+
+        Each shape is reported separately. `outer` is only timed on 1-D
+        arrays, as the result has both shapes.
+        """
+        res = {}
+        for method in self.ufunc_methods:
+            for shape in SHAPES:
+                if method == 'outer' and len(shape) > 1:
+                    continue
+                key = 'ufunc_{}_{}'.format(
+                    method, 'x'.join(str(n) for n in shape))
+                if len(self.ufunc_method_funcs[method]) == 0:
+                    mean, std, rel = -1, -1, -1
+                else:
+                    mean, std, rel = self.time_func(
+                        self.ufunc_method_timer(method), shapes=(shape,),
+                        key=key)
+                res[key] = {'mean': mean, 'std': std, 'np_rel': rel}
+        return res
+
+    def indexing_compatibility(self):
+        res = {}
+        for key, method in self.indexing_funcs:
+            try:
+                self.sample_func(getattr(self, method), (10,))
+            except Exception:
+                res[key] = False
+            else:
+                res[key] = True
+
+        # Does a basic slice share memory with the original?
+        x = self.make(self.rand((10,)), 'm')
+        try:
+            res['slice_view'] = bool(np.may_share_memory(
+                self.magnitude(x[::2]), self.magnitude(x)))
+        except Exception:
+            res['slice_view'] = False
+        return {'indexing': res}
+
+    def time_indexing(self):
+        res = {}
+        for key, method in self.indexing_funcs:
+            mean, std, rel = self.time_func(getattr(self, method),
+                                            key='index_' + key)
+            res['index_' + key] = {'mean': mean, 'std': std, 'np_rel': rel}
+        return res
+
+    def time_iteration(self, n=1000):
+        """Time iterating over 1-D arrays, per element.
+
+        For `list` and `tolist`, also counts how many gc-tracked objects
+        are created per element.
+        """
+        res = {}
+        for key, method in self.iteration_funcs:
+            func = getattr(self, method)
+            mean, std, rel = self.time_func(func, shapes=((10,), (n,)),
+                                            key='iter_' + key)
+            res['iter_' + key] = {'mean': mean, 'std': std, 'np_rel': rel}
+
+        x = self.make(self.rand((n,)), 'm')
+        for key, func in [('list', list), ('tolist', lambda q: q.tolist())]:
+            try:
+                objects = float(count_objects(func, x)) / n
+            except Exception:
+                objects = -1
+            res['iter_' + key]['objects'] = objects
+        return res
+
+    def time_construction(self):
+        """Time construction from different inputs and unit strings.
+
+        Unit strings are parsed by the package's own parser. Packages
+        without one get units with `make`, and unit strings that `make`
+        can't look up are left out, as unsupported.
+        """
+        kinds = list(self.construct_kinds)
+        construct_units = list(self.construct_units)
+        parse = True
+        try:
+            self.make_from_string(1.0, 'm')
+        except NotImplementedError:
+            parse = False
+            for label, units in self.construct_units:
+                try:
+                    self.make(1.0, units)
+                except Exception:
+                    construct_units.remove((label, units))
+        except Exception:
+            # Timed anyway, so it's reported as failing
+            pass
+
+        try:
+            self.remake(self.make(1.0, 'm'), 'm')
+        except NotImplementedError:
+            # Nothing to time; the quantity entries are left out
+            kinds.remove('quantity')
+        except Exception:
+            # Timed anyway, so it's reported as failing
+            pass
+
+        res = {}
+        for kind in kinds:
+            for label, units in construct_units:
+                key = 'make_{}_{}'.format(kind, label)
+                mean, std, rel = self.time_func(
+                    self.construct_timer(kind, units, parse), key=key)
+                res[key] = {'mean': mean, 'std': std, 'np_rel': rel}
+        return res
+
+    def time_formatting(self):
+        """Time str, repr and format, and the best unit display if any."""
+        funcs = list(self.format_funcs)
+        has_best = True
+        try:
+            self.best_unit_str(self.make(1.0, 'm'))
+        except NotImplementedError:
+            has_best = False
+        except Exception:
+            # Timed anyway, so it's reported as failing
+            pass
+        if has_best:
+            funcs.append(('best', self.best_unit_str))
+
+        res = {}
+        for label, func in funcs:
+            for kind, shape in self.format_shapes:
+                key = 'format_{}_{}'.format(label, kind)
+                mean, std, rel = self.time_func(
+                    self.format_timer(label, func, shape), shapes=(None,),
+                    key=key)
+                res[key] = {'mean': mean, 'std': std, 'np_rel': rel}
+        return res
+
+    def time_latency(self, iters=10000):
+        """Latency percentiles of op and ufunc calls on scalars.
+
+        Calls are timed in batches of at least LATENCY_MIN_MS, `iters`
+        times, on a NumPy scalar and, separately, on a (1,) array, so
+        GC pauses and first-use cache fills show up as the tail of the
+        distribution rather than being averaged away.
+        """
+        res = {}
+        for kind, prefix in [('ops', 'op'), ('ufuncs', 'ufunc')]:
+            unary = getattr(self, 'unary_' + kind)
+            binary = getattr(self, 'binary_same_' + kind)
+            funcs = [(f, False) for f in unary] + [(f, True) for f in binary]
+            for func, is_binary in funcs:
+                for shape in self.latency_shapes:
+                    key = 'latency_{}_{}_{}'.format(
+                        prefix, func.__name__,
+                        'x'.join(str(n) for n in shape) or 'scalar')
+                    histogram = LatencyHistogram()
+                    mean, std, rel = self.time_func(
+                        self.latency_timer(func, is_binary),
+                        shapes=(shape,), iters=iters,
+                        histogram=histogram, key=key)
+                    entry = {'mean': mean, 'std': std, 'np_rel': rel}
+                    for q in LATENCY_PERCENTILES:
+                        stat = 'p' + str(q).replace('.', '')
+                        if timed_ok((mean, std, rel)):
+                            entry[stat] = histogram.percentile(q)
+                        else:
+                            entry[stat] = np.nan
+                    res[key] = entry
+        return res
+
+    def time_errors(self):
+        """Time raising and catching dimension mismatch errors.
+
+        Only operations that work on same units but fail on different
+        units are timed. If the package has a non-raising dimension check,
+        that is timed as well, though it has no NumPy equivalent.
+        """
+        res = {}
+        groups = [
+            ('op', self.binary_same_ops, self.binary_different_ops),
+            ('ufunc', self.binary_same_ufuncs, self.binary_different_ufuncs),
+        ]
+        for kind, same, different in groups:
+            for func in same:
+                if func in different:
+                    continue
+                key = 'error_{}_{}'.format(kind, func.__name__)
+                mean, std, rel = self.time_func(self.error_timer(func),
+                                                key=key)
+                res[key] = {'mean': mean, 'std': std, 'np_rel': rel}
+
+        try:
+            self.same_dimensions(self.make(self.rand((2,)), 'm'),
+                                 self.make(self.rand((2,)), 's'))
+        except NotImplementedError:
+            pass
+        else:
+            mean, std, rel = self.time_func(self.time_same_dimensions,
+                                            key='check_dimensions')
+            res['check_dimensions'] = {
+                'mean': mean, 'std': std, 'np_rel': np.nan}
+        return res
+
+    def accuracy(self, shape=(100,)):
+        """Compare the results of ops and ufuncs, in SI units, with NumPy.
+
+        NumPy's results are computed on the same values, converted to SI
+        with explicit factors. For ops and ufuncs, the largest relative
+        error and error in ULPs are reported, along with the worst func.
+        Boolean results, and results that can't be converted, are skipped,
+        as are unary funcs of the non-SI operand (e.g., `np.floor` depends
+        on which unit the result is in).
+        """
+        data = [self.rand(shape), -self.rand(shape),
+                self.rand(shape), -self.rand(shape)]
+        try:
+            compatible, factor = self.make(data[2], 'mile'), 1609.344
+        except Exception:
+            compatible, factor = self.make(data[2], 'ft'), 0.3048
+        args = (self.make(data[0], 'm'), self.make(data[1], 'm'),
+                compatible, self.make(data[3], 's'))
+        si = (data[0], data[1], data[2] * factor, data[3])
+        try:
+            self.to_si(args[0])
+        except NotImplementedError:
+            return {}
+
+        res = {}
+        for kind, key in [('ops', 'ops'), ('ufuncs', 'ufunc')]:
+            rel, ulp, worst = 0.0, 0.0, None
+            for (func, a), (_, s) in zip(self.func_cases(kind, *args),
+                                         self.func_cases(kind, *si)):
+                if len(a) == 1 and a[0] is compatible:
+                    continue
+                try:
+                    expected = func(*s)
+                    if np.asarray(expected).dtype.kind != 'f':
+                        continue
+                    r, u = max_errors(self.to_si(func(*a)), expected)
+                except Exception:
+                    continue
+                if r > rel or worst is None:
+                    worst = func.__name__
+                rel, ulp = max(rel, r), max(ulp, u)
+            res[key] = {'max_rel_err': rel, 'max_ulp': ulp, 'worst': worst}
+        return res
+
+    def time_formulas(self, iters=5):
+        """Time whole formulas on large arrays."""
+        res = {}
+        for name, formula in self.formulas:
+            mean, std, rel = self.time_func(
+                self.formula_timer(name, formula),
+                shapes=self.formula_shapes, iters=iters,
+                key='formula_' + name)
+            res['formula_' + name] = {'mean': mean, 'std': std, 'np_rel': rel}
+        return res
+
+    def time_complexity(self):
+        """Time multiplying and dividing quantities with complex units.
+
+        Units are products of 1 to 9 units, either distinct base units
+        with integer or fractional exponents, or differently named
+        lengths (so only one dimension is involved, but more names).
+        For each series, the slope (ms per extra unit) is also reported.
+        """
+        res = {}
+        series = [
+            ('int', self.complexity_bases, 2),
+            ('frac', self.complexity_bases, 0.5),
+            ('names', self.complexity_names, 1),
+        ]
+        for label, units, exponent in series:
+            ns, means = [], []
+            for n in range(1, len(units) + 1):
+                key = 'complexity_{}_{}'.format(label, n)
+                mean, std, rel = self.time_func(
+                    self.complexity_timer(units[:n], exponent),
+                    shapes=((1,), (1000,)), key=key)
+                res[key] = {'mean': mean, 'std': std, 'np_rel': rel}
+                if timed_ok((mean, std, rel)):
+                    ns.append(n)
+                    means.append(mean)
+            slope = np.polyfit(ns, means, 1)[0] if len(ns) > 1 else np.nan
+            res['complexity_{}_slope'.format(label)] = {
+                'mean': slope, 'std': np.nan, 'np_rel': np.nan}
+        return res
+
+    def time_registry(self, n=100):
+        """Time unit lookup, construction and display as the registry grows.
+
+        Synthetic units (multiples of m**4, which no package has a name
+        for) are registered through the package's own API until there are
+        `registry_sizes` of them. At each size, `n` random registered
+        names are looked up, used to make a quantity, and, if the package
+        picks a best unit for display, a few quantities are displayed.
+        This changes the package's global state, so is not in SUITES.
+        """
+        names = []
+        res = {}
+        rng = np.random.RandomState(0)
+        for size in self.registry_sizes:
+            new = ['regunit%d' % i for i in range(len(names), size)]
+            try:
+                with Timer() as t:
+                    for i, name in enumerate(new, len(names)):
+                        self.register_unit(name, 1.0 + i * 1e-6)
+            except NotImplementedError:
+                return res
+            names.extend(new)
+            res['registry_define_%d' % size] = {
+                'mean': t.msecs / len(new), 'std': np.nan, 'np_rel': np.nan}
+
+            sample = [names[i] for i in rng.randint(len(names), size=n)]
+            data = self.rand((10,))
+            timers = [
+                ('lookup', self.lookup_unit, sample),
+                ('make', lambda name: self.make(data, name), sample),
+            ]
+            display = [self.make(self.rand((1,)), name) for name in sample[:10]]
+            try:
+                self.best_unit_str(display[0])
+            except NotImplementedError:
+                pass
+            else:
+                timers.append(('display', self.best_unit_str, display))
+
+            for label, func, args in timers:
+                key = 'registry_{}_{}'.format(label, size)
+                mean, std, _ = self.time_func(
+                    self.registry_timer(label, func, args),
+                    shapes=((1,),), iters=20, key=key)
+                # Nothing to compare to in NumPy
+                res[key] = {'mean': mean, 'std': std, 'np_rel': np.nan}
+        return res
+
+    def time_unchecked(self):
+        """Time ops and ufuncs with dimension checking turned off.
+
+        A validation pass first checks, call by call, whether checking on
+        and off give identical values (in SI units), or raise the same
+        exception; the funcs with any call that doesn't are listed.
+        They can differ when checking turns a mismatch into an error
+        that NumPy then handles for an object array (e.g., `!=` in dimpy).
+        """
+        try:
+            self.set_checking(True)
+        except NotImplementedError:
+            return {}
+
+        args = self.make_args(inspect.getargspec(self.time_ops), (10,))[1]
+        res = {}
+        try:
+            for kind in ('ops', 'ufuncs'):
+                cases = self.func_cases(kind, *args)
+                checked = [outcome(func, a) for func, a in cases]
+                self.set_checking(False)
+                unchecked = [outcome(func, a) for func, a in cases]
+                self.set_checking(True)
+                differs = sorted(set(
+                    func.__name__ for (func, a), c, u
+                    in zip(cases, checked, unchecked)
+                    if not self.same_outcome(c, u)))
+
+                func = getattr(self, 'time_' + kind)
+                key = 'unchecked_' + kind
+                checked = self.time_func(func, key=key + '_checked')
+                self.set_checking(False)
+                mean, std, rel = unchecked = self.time_func(func, key=key)
+                self.set_checking(True)
+                if timed_ok(checked) and timed_ok(unchecked):
+                    speedup = checked[0] / mean
+                else:
+                    speedup = np.nan
+                res[key] = {
+                    'mean': mean, 'std': std, 'np_rel': rel,
+                    'speedup': speedup, 'identical': len(differs) == 0,
+                    'differs': ', '.join(differs)}
+        finally:
+            self.set_checking(True)
+        return res
+
+    def time_conversion(self):
+        """Time the implicit conversion in compatible binary ops and ufuncs.
+
+        The compatible ops are timed on operands in different units
+        (m and mile, or ft), then on operands that are both in m.
+        The difference is the overhead of converting on every call.
+        """
+        res = {}
+        for kind in ('ops', 'ufuncs'):
+            if len(getattr(self, 'binary_compatible_' + kind)) == 0:
+                continue
+            mean, std, rel = compatible = self.time_func(
+                self.conversion_timer(kind, True), key='conversion_' + kind)
+            same = self.time_func(self.conversion_timer(kind, False),
+                                  key='conversion_{}_same_unit'.format(kind))
+            if timed_ok(compatible) and timed_ok(same):
+                overhead = mean - same[0]
+                overhead_rel = mean / same[0]
+            else:
+                overhead = overhead_rel = np.nan
+            res['conversion_' + kind] = {
+                'mean': mean, 'std': std, 'np_rel': rel,
+                'same_unit': same[0], 'overhead': overhead,
+                'overhead_rel': overhead_rel}
+        return res
 
     ## To be overridden by subclasses
 
@@ -388,23 +1622,159 @@ class BenchModule(object):
     def make(self, ndarray, units):
         raise NotImplementedError()
 
+    def same_dimensions(self, x, y):
+        raise NotImplementedError()
 
-def bench(cls):
-    np_obj = BenchNumpy()
-    b = cls(np_obj)
+    def make_from_string(self, data, units):
+        """Make a quantity, parsing `units` with the package's own parser.
 
-    res = {}
-    res['name'] = b.name
-    res['facts'] = b.facts
-    try:
-        res['syntax'] = b.syntax()
-    except Exception as e:
-        res['syntax'] = str(e)
+        Unlike `make`, which for many packages looks `units` up by name.
+        """
+        raise NotImplementedError()
+
+    def remake(self, q, units):
+        """Pass `q`, already a quantity in `units`, to the constructor again.
+
+        As done by functions that accept either arrays or quantities.
+        Not `make`, which for many packages multiplies by a unit.
+        """
+        raise NotImplementedError()
+
+    def magnitude(self, q):
+        """The ndarray holding the values of `q`."""
+        return np.asarray(q)
+
+    def evaluate(self, q):
+        """Compute `q`, for packages that defer computation."""
+        return q
+
+    def register_unit(self, name, factor):
+        """Add a unit called `name`, equal to `factor` m**4."""
+        raise NotImplementedError()
+
+    def lookup_unit(self, name):
+        """Get the unit called `name` from the package's registry."""
+        raise NotImplementedError()
+
+    def best_unit_str(self, q):
+        """`q` as a string, in the unit the package picks as best."""
+        raise NotImplementedError()
+
+    def has_units(self, q):
+        """Whether `q` (e.g., the result of `np.dot`) is a quantity."""
+        return not (type(q) is np.ndarray or isinstance(
+            q, (numbers.Number, np.generic)))
+
+    def to_si(self, q):
+        """The values of `q` in SI base units, as an ndarray.
+
+        `q` may also be the plain result of an operation
+        (e.g., a bool array from a comparison).
+        """
+        raise NotImplementedError()
+
+    def set_checking(self, enabled):
+        """Turn dimension checking in the package on or off."""
+        raise NotImplementedError()
+
+
+# Each suite is (name, BenchModule method, result key).
+# Suites sharing a result key are merged into the same record entry.
+SUITES = [
+    ('syntax', 'syntax', 'syntax'),
+    ('compatibility', 'compatibility', 'compatibility'),
+    ('speed', 'time', 'speed'),
+    ('accuracy', 'accuracy', 'speed'),
+    ('conversion', 'time_conversion', 'speed'),
+    ('errors', 'time_errors', 'speed'),
+    ('formatting', 'time_formatting', 'speed'),
+    ('indexing_compatibility', 'indexing_compatibility', 'compatibility'),
+    ('indexing', 'time_indexing', 'speed'),
+    ('iteration', 'time_iteration', 'speed'),
+    ('construction', 'time_construction', 'speed'),
+    ('unchecked', 'time_unchecked', 'speed'),
+    ('formula', 'time_formulas', 'speed'),
+    ('complexity', 'time_complexity', 'speed'),
+    ('ufunc_method_compatibility', 'ufunc_method_compatibility',
+     'compatibility'),
+    ('ufunc_methods', 'time_ufunc_methods', 'speed'),
+    ('array_func_compatibility', 'array_func_compatibility', 'compatibility'),
+    ('allocations', 'count_allocs', 'cost'),
+]
+
+# Suites that are only run when asked for,
+# e.g., because they change the package's global state
+OPTIONAL_SUITES = [
+    ('registry', 'time_registry', 'speed'),
+    ('cost', 'count_costs', 'cost'),
+    ('array_funcs', 'time_array_funcs', 'speed'),
+    ('latency', 'time_latency', 'speed'),
+]
+
+
+def class_suites(cls, suites=SUITES):
+    """The suites in `suites` that `cls` runs."""
+    if cls.only_suites is None:
+        return list(suites)
+    return [s for s in suites if s[0] in cls.only_suites]
+
+
+def bench_header(b):
+    return {'name': b.name, 'facts': b.facts,
+            'fingerprint': fingerprint.fingerprint(b)}
+
+
+def bench_suite(b, suite, gc_stats=None, disable_gc=False):
+    """Run a suite, optionally with the garbage collector disabled.
+
+    If `gc_stats` is a dict, the collections done during the suite and
+    the time spent in them are stored in it, under the suite's name.
+    """
+    name, method, key = suite
+    enabled = gc.isenabled()
+    if disable_gc:
+        gc.disable()
     try:
-        res['compatibility'] = b.compatibility()
+        with GCMonitor() as monitor:
+            return getattr(b, method)()
     except Exception as e:
-        res['compatibility'] = str(e)
-    res['speed'] = b.time()
+        # Returned rather than raised, so the failure is checkpointed
+        # and resuming skips the suite rather than failing in it again
+        return str(e)
+    finally:
+        if enabled:
+            gc.enable()
+        if gc_stats is not None:
+            gc_stats[name] = monitor.stats()
+
+
+def merge_suite(res, suite, value):
+    name, method, key = suite
+    if isinstance(value, basestring):
+        # The error message of a suite that failed; kept apart so it
+        # doesn't replace (or get replaced by) other suites' results
+        res.setdefault('failed', {})[name] = value
+        return
+    if not (isinstance(res.get(key), dict) and isinstance(value, dict)):
+        res[key] = value
+        return
+
+    # Merge entries too, so suites can add stats to another suite's entry
+    for k, v in value.items():
+        if isinstance(res[key].get(k), dict) and isinstance(v, dict):
+            res[key][k].update(v)
+        else:
+            res[key][k] = v
+
+
+def bench(cls, suites=SUITES, disable_gc=False):
+    np_obj = BenchNumpy()
+    b = cls(np_obj)
+
+    res = bench_header(b)
+    res['gc'] = {}
+    for suite in class_suites(cls, suites):
+        merge_suite(res, suite, bench_suite(b, suite, res['gc'], disable_gc))
     return res
 
 
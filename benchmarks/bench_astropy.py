@@ -29,6 +29,20 @@ class BenchAstropy(base.BenchModule):
         except:
             return getattr(astropy.units.imperial, units) * ndarray
 
+    def make_from_string(self, data, units):
+        return astropy.units.Quantity(data, units)
+
+    def remake(self, q, units):
+        return astropy.units.Quantity(q, units)
+
+    def same_dimensions(self, x, y):
+        return x.unit.is_equivalent(y.unit)
+
+    def to_si(self, q):
+        if isinstance(q, astropy.units.Quantity):
+            return q.si.value
+        return q
+
 
 if __name__ == '__main__':
     import warnings
@@ -25,6 +25,27 @@ class BenchDimensions(base.BenchModule):
     def make(self, ndarray, units):
         return dimensions.Q(ndarray, units)
 
+    def make_from_string(self, data, units):
+        return dimensions.Q(data, units)
+
+    def same_dimensions(self, x, y):
+        return x.dims == y.dims
+
+    def magnitude(self, q):
+        return q.value
+
+    def register_unit(self, name, factor):
+        dimensions.units.addUnit(name, (factor, 'm**4'))
+
+    def lookup_unit(self, name):
+        return dimensions.units[name]
+
+    def to_si(self, q):
+        return q.value if isinstance(q, dimensions.Q) else q
+
+    def set_checking(self, enabled):
+        dimensions.check_dims = enabled
+
 
 if __name__ == '__main__':
     import warnings
@@ -1,5 +1,6 @@
 import numpy as np
 import dimpy
+import dimpy.units
 
 import base
 
@@ -30,6 +31,39 @@ class BenchDimpy(base.BenchModule):
     def make(self, ndarray, units):
         return getattr(dimpy, units) * ndarray
 
+    def make_from_string(self, data, units):
+        return dimpy.parse(units) * data
+
+    def same_dimensions(self, x, y):
+        # Arrays are object arrays of Quantity; check the first elements
+        return dimpy.have_same_dimensions(x.flat[0], y.flat[0])
+
+    def register_unit(self, name, factor):
+        unit = dimpy.Unit.create(dimpy.Dimension(m=4), name, name, factor)
+        dimpy.register_new_unit(unit)
+        # So that make() can find it
+        setattr(dimpy, name, unit)
+
+    def lookup_unit(self, name):
+        return getattr(dimpy, name)
+
+    def best_unit_str(self, q):
+        if isinstance(q, dimpy.units.Quantity):
+            return q.in_best_unit()
+        return ', '.join(x.in_best_unit() for x in q.flat)
+
+    def has_units(self, q):
+        # Arrays of quantities are object arrays
+        return any(isinstance(x, dimpy.units.Quantity) for x in np.ravel(q))
+
+    def to_si(self, q):
+        # Quantity values are always in SI units
+        values = [float(x) if isinstance(x, dimpy.units.Quantity) else x
+                  for x in np.ravel(q)]
+        return np.array(values, dtype=object).reshape(np.shape(q))
+
+    def set_checking(self, enabled):
+        dimpy.units.check_dimensions = enabled
 
 
 if __name__ == '__main__':
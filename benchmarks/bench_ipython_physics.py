@@ -26,6 +26,29 @@ class BenchIpythonPhysics(base.BenchModule):
     def make(self, ndarray, units):
         return physics.Q(ndarray, units)
 
+    def make_from_string(self, data, units):
+        return physics.Q(data, units)
+
+    def same_dimensions(self, x, y):
+        return x.unit.powers == y.unit.powers
+
+    def magnitude(self, q):
+        return q.value
+
+    def register_unit(self, name, factor):
+        physics._addUnit(name, '%r*m**4' % factor)
+
+    def lookup_unit(self, name):
+        return physics._findUnit(name)
+
+    def to_si(self, q):
+        if physics.isPhysicalQuantity(q):
+            return q.value * q.unit.factor
+        return q
+
+    def set_checking(self, enabled):
+        physics.check_units = enabled
+
 
 if __name__ == '__main__':
     import warnings
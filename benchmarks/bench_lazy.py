@@ -0,0 +1,39 @@
+import numpy as np
+import lazy
+
+import base
+
+
+class BenchLazy(base.BenchModule):
+    facts = {
+        'LOC': 168,
+        'First release': '2026-10',
+        'Most recent release': '2026-10',
+        'Implementation': 'Expression graph',
+        'URL': 'https://github.com/tbekolay/quantities-comparison',
+        'PyPI': False,
+    }
+    # Operations are only computed when evaluated, so only whole
+    # formulas can be timed fairly
+    only_suites = ('syntax', 'formula')
+
+    @property
+    def name(self):
+        return "lazy"
+
+    @property
+    def make_syntax(self):
+        return "constructor"
+
+    def make(self, ndarray, units):
+        return lazy.quantity(ndarray, units)
+
+    def evaluate(self, q):
+        return lazy.evaluate(q)
+
+
+if __name__ == '__main__':
+    import warnings
+    warnings.simplefilter('ignore')
+    np.seterr(all='ignore')
+    base.bench(BenchLazy)
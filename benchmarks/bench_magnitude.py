@@ -13,6 +13,10 @@ class BenchMagnitude(base.BenchModule):
         'URL': 'http://juanreyero.com/open/magnitude/index.html',
         'PyPI': 'magnitude',
     }
+    # magnitude's parser doesn't know * or **
+    construct_units = base.BenchModule.construct_units[:-1] + [
+        ('compound', 'kg m/s2'),
+    ]
 
     @property
     def name(self):
@@ -25,6 +29,21 @@ class BenchMagnitude(base.BenchModule):
     def make(self, ndarray, units):
         return magnitude.mg(ndarray, units)
 
+    def make_from_string(self, data, units):
+        return magnitude.mg(data, units)
+
+    def same_dimensions(self, x, y):
+        return x.dimension() == y.dimension()
+
+    def magnitude(self, q):
+        return q.val
+
+    def to_si(self, q):
+        # Magnitudes are always stored in SI units
+        if isinstance(q, magnitude.Magnitude):
+            return q.val
+        return q
+
 
 if __name__ == '__main__':
     import warnings
@@ -29,6 +29,10 @@ class BenchNumericalunits(base.BenchModule):
     def make(self, ndarray, units):
         return ndarray * getattr(numericalunits, units)
 
+    def has_units(self, q):
+        # Units are folded into the values, so anything numeric keeps them
+        return True
+
 
 if __name__ == '__main__':
     import warnings
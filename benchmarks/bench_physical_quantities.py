@@ -26,6 +26,20 @@ class BenchPhysicalQuantities(base.BenchModule):
     def make(self, ndarray, units):
         return pq.PhysicalQuantity(ndarray, units)
 
+    def make_from_string(self, data, units):
+        return pq.PhysicalQuantity(data, units)
+
+    def same_dimensions(self, x, y):
+        return x.unit.isCompatible(y.unit)
+
+    def magnitude(self, q):
+        return q.value
+
+    def to_si(self, q):
+        if pq.isPhysicalQuantity(q):
+            return q.value * q.unit.factor
+        return q
+
 
 if __name__ == '__main__':
     import warnings
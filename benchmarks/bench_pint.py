@@ -29,6 +29,32 @@ class BenchPint(base.BenchModule):
     def make(self, ndarray, units):
         return ndarray * getattr(self.unitreg, units)
 
+    def make_from_string(self, data, units):
+        return self.unitreg.Quantity(data, units)
+
+    def remake(self, q, units):
+        return self.unitreg.Quantity(q, units)
+
+    def same_dimensions(self, x, y):
+        return x.dimensionality == y.dimensionality
+
+    def magnitude(self, q):
+        return q.magnitude
+
+    def to_si(self, q):
+        if isinstance(q, self.unitreg.Quantity):
+            return q.to_base_units().magnitude
+        return q
+
+    def register_unit(self, name, factor):
+        self.unitreg.define('%s = %r * meter ** 4' % (name, factor))
+
+    def lookup_unit(self, name):
+        return self.unitreg.parse_units(name)
+
+    def best_unit_str(self, q):
+        return str(q.to_compact())
+
 
 if __name__ == '__main__':
     import warnings
@@ -25,6 +25,20 @@ class BenchQuantities(base.BenchModule):
     def make(self, ndarray, units):
         return ndarray * getattr(pq, units)
 
+    def make_from_string(self, data, units):
+        return pq.Quantity(data, units)
+
+    def remake(self, q, units):
+        return pq.Quantity(q, units)
+
+    def same_dimensions(self, x, y):
+        return x.dimensionality.simplified == y.dimensionality.simplified
+
+    def to_si(self, q):
+        if isinstance(q, pq.Quantity):
+            return q.simplified.magnitude
+        return q
+
 
 if __name__ == '__main__':
     import warnings
@@ -0,0 +1,49 @@
+import numpy as np
+import reference
+
+import base
+
+
+class BenchReference(base.BenchModule):
+    facts = {
+        'LOC': 285,
+        'First release': '2026-10',
+        'Most recent release': '2026-10',
+        'Implementation': 'Subclass',
+        'URL': 'https://github.com/tbekolay/quantities-comparison',
+        'PyPI': False,
+    }
+
+    @property
+    def name(self):
+        return "reference"
+
+    @property
+    def make_syntax(self):
+        return "constructor"
+
+    def make(self, ndarray, units):
+        return reference.Quantity(ndarray, units)
+
+    def make_from_string(self, data, units):
+        return reference.Quantity(data, units)
+
+    def remake(self, q, units):
+        return reference.Quantity(q, units)
+
+    def same_dimensions(self, x, y):
+        return x.dims == y.dims
+
+    def has_units(self, q):
+        # NumPy functions other than ufuncs give unknown dimensions
+        return isinstance(q, reference.Quantity) and q.dims is not None
+
+    def to_si(self, q):
+        return np.asarray(q)
+
+
+if __name__ == '__main__':
+    import warnings
+    warnings.simplefilter('ignore')
+    np.seterr(all='ignore')
+    base.bench(BenchReference)
@@ -26,6 +26,18 @@ class BenchScimath(base.BenchModule):
         d = scimath.unit_parser.parse_unit(units)
         return scimath.UnitArray(ndarray, units=d)
 
+    def make_from_string(self, data, units):
+        return scimath.UnitArray(
+            data, units=scimath.unit_parser.parse_unit(units))
+
+    def same_dimensions(self, x, y):
+        return x.units.derivation == y.units.derivation
+
+    def to_si(self, q):
+        if isinstance(q, scimath.UnitArray):
+            return np.asarray(q) * q.units.value
+        return q
+
 
 if __name__ == '__main__':
     import warnings
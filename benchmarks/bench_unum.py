@@ -26,6 +26,9 @@ class BenchUnum(base.BenchModule):
         # NB! units must be on the left!
         return getattr(unum.units, units) * ndarray
 
+    def magnitude(self, q):
+        return q._value
+
 
 if __name__ == '__main__':
     import warnings
@@ -70,6 +70,9 @@ from math import log as log
 
 
 automatically_register_units = False
+# Set to False to skip dimension checks and dimension algebra in Quantity
+# arithmetic; values are SI already, so only the values are computed.
+check_dimensions = True
 
 class Dimension(object):
     '''Stores the indices of the 7 basic SI unit dimension (length, mass, etc).
@@ -404,7 +407,7 @@ class Quantity(object):
         # This code, like all the other arithmetic code below, implements the casting rules
         # defined above.
         if isinstance(other,Quantity):
-            return Quantity.with_dimensions(float(self)*float(other),self.dim*other.dim)
+            return Quantity.with_dimensions(float(self)*float(other),self.dim*other.dim if check_dimensions else self.dim)
         elif is_scalar_type(other):
             return Quantity.with_dimensions(float(self)*other,self.dim)
         else:
@@ -413,14 +416,14 @@ class Quantity(object):
         return self.__mul__(other)
     def __div__(self,other):
         if isinstance(other,Quantity):
-            return Quantity.with_dimensions(float(self)/float(other),self.dim/other.dim)
+            return Quantity.with_dimensions(float(self)/float(other),self.dim/other.dim if check_dimensions else self.dim)
         elif is_scalar_type(other):
             return Quantity.with_dimensions(float(self)/other,self.dim)
         else:
             return NotImplemented
     def __truediv__(self,other):
         if isinstance(other,Quantity):
-            return Quantity.with_dimensions(float(self)/float(other),self.dim/other.dim)
+            return Quantity.with_dimensions(float(self)/float(other),self.dim/other.dim if check_dimensions else self.dim)
         elif is_scalar_type(other):
             return Quantity.with_dimensions(float(self)/other,self.dim)
         else:
@@ -441,6 +444,8 @@ class Quantity(object):
             return self.value.__rtruediv__(other)
     def __add__(self,other):
         if isinstance(other,Quantity) or is_scalar_type(other):
+            if not check_dimensions:
+                return Quantity.with_dimensions(float(self)+float(other),self.dim)
             dim = get_dimensions(other)
             if dim==self.dim or other == 0:
                 return Quantity.with_dimensions(float(self)+float(other),self.dim)
@@ -451,6 +456,8 @@ class Quantity(object):
         return self.__add__(other)
     def __sub__(self,other):
         if isinstance(other,Quantity) or is_scalar_type(other):
+            if not check_dimensions:
+                return Quantity.with_dimensions(float(self)-float(other),self.dim)
             dim = get_dimensions(other)
             if dim==self.dim or other == 0:
                 return Quantity.with_dimensions(float(self)-float(other),self.dim)
@@ -459,6 +466,8 @@ class Quantity(object):
             return NotImplemented
     def __rsub__(self,other):
         if isinstance(other,Quantity) or is_scalar_type(other):
+            if not check_dimensions:
+                return Quantity.with_dimensions(float(other)-float(self),self.dim)
             dim = get_dimensions(other)
             if dim==self.dim:
                 return Quantity.with_dimensions(float(other)-float(self),self.dim)
@@ -473,7 +482,7 @@ class Quantity(object):
                 return Quantity.with_dimensions(float(self)**float(other),self.dim**float(other))
             else: raise DimensionMismatchError("Power",self.dim,other.dim)
         elif is_scalar_type(other):
-            return Quantity.with_dimensions(float(self)**other,self.dim**other)
+            return Quantity.with_dimensions(float(self)**other,self.dim**other if check_dimensions else self.dim)
         else:
             return self.value.__pow__(other)
     def __rpow__(self,other):
@@ -495,7 +504,7 @@ class Quantity(object):
     #### COMPARISONS ####
     def __lt__(self,other):
         if isinstance(other,Quantity):
-            if self.dim==other.dim:
+            if not check_dimensions or self.dim==other.dim:
                 return float(self)<float(other)
             else: raise DimensionMismatchError("LessThan",self.dim,other.dim)
         elif is_scalar_type(other):
@@ -507,7 +516,7 @@ class Quantity(object):
             return self.value.__lt__(other)
     def __le__(self,other):
         if isinstance(other,Quantity):
-            if self.dim==other.dim:
+            if not check_dimensions or self.dim==other.dim:
                 return float(self)<=float(other)
             else: raise DimensionMismatchError("LessThanOrEquals",self.dim,other.dim)
         elif is_scalar_type(other):
@@ -519,7 +528,7 @@ class Quantity(object):
             return self.value.__le__(other)
     def __gt__(self,other):
         if isinstance(other,Quantity):
-            if self.dim==other.dim:
+            if not check_dimensions or self.dim==other.dim:
                 return float(self)>float(other)
             else: raise DimensionMismatchError("GreaterThan",self.dim,other.dim)
         elif is_scalar_type(other):
@@ -531,7 +540,7 @@ class Quantity(object):
             return self.value.__gt__(other)
     def __ge__(self,other):
         if isinstance(other,Quantity):
-            if self.dim==other.dim:
+            if not check_dimensions or self.dim==other.dim:
                 return float(self)>=float(other)
             else: raise DimensionMismatchError("GreaterThanOrEquals",self.dim,other.dim)
         elif is_scalar_type(other):
@@ -543,7 +552,7 @@ class Quantity(object):
             return self.value.__ge__(other)
     def __eq__(self,other):
         if isinstance(other,Quantity):
-            if self.dim==other.dim:
+            if not check_dimensions or self.dim==other.dim:
                 return float(self)==float(other)
             else: return False
         elif is_scalar_type(other):
@@ -555,7 +564,7 @@ class Quantity(object):
             return self.value.__eq__(other)
     def __ne__(self,other):
         if isinstance(other,Quantity):
-            if self.dim==other.dim:
+            if not check_dimensions or self.dim==other.dim:
                 return float(self)!=float(other)
             else: raise DimensionMismatchError("Equals",self.dim,other.dim)
         elif is_scalar_type(other):
@@ -853,3 +862,18 @@ __all__.extend(Quantity.all_unit_names)
 if __name__=="__main__":
     import doctest
     doctest.testmod()
+
+    # Without checks we get the same values, and mismatches pass silently
+    d=2*metre
+    t=4*second
+    m=3*kilogram
+    def values():
+        return [float(m*d/t**2), float(d/t), float(t/d), float(d**2),
+                float(d+0.5*metre), float(d-0.5*metre), float(-d),
+                float(abs(d)), d<3*metre, d>=d]
+    checked=values()
+    check_dimensions=False
+    unchecked=values()
+    assert(checked==unchecked)
+    assert(float(d+t)==float(d)+float(t))
+    check_dimensions=True
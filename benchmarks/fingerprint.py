@@ -0,0 +1,82 @@
+"""Describe the setup that results were measured with.
+
+Timings from different machines, Python builds or NumPy builds (e.g.,
+with a different BLAS) can't be compared directly, so every result
+records the machine, Python, NumPy and the version of the package.
+"""
+
+import multiprocessing
+import os
+import platform
+
+import numpy as np
+
+try:
+    import pkg_resources
+except ImportError:
+    pkg_resources = None
+
+_machine = None
+
+
+def cpu_model():
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except (IOError, OSError):
+        pass
+    return platform.processor() or platform.machine()
+
+
+def memory():
+    """Physical memory, in bytes (None if unknown)."""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def blas():
+    """The BLAS libraries NumPy was built with."""
+    try:
+        info = np.__config__.get_info('blas_opt_info')
+    except Exception:
+        return None
+    return sorted(set(info.get('libraries', [])))
+
+
+def machine():
+    """The machine, Python and NumPy used for this run."""
+    global _machine
+    if _machine is None:
+        _machine = {'cpu': cpu_model(),
+                    'cores': multiprocessing.cpu_count(),
+                    'memory': memory(),
+                    'platform': platform.platform(),
+                    'python_implementation': platform.python_implementation(),
+                    'python_version': platform.python_version(),
+                    'numpy': np.__version__,
+                    'blas': blas()}
+    return dict(_machine)
+
+
+def package_version(b):
+    """The installed version of the package that `b` benchmarks.
+
+    None for packages that aren't on PyPI (e.g., copies in benchmarks/).
+    """
+    dist = b.facts.get('PyPI')
+    if not dist or pkg_resources is None:
+        return None
+    try:
+        return pkg_resources.get_distribution(dist).version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+
+def fingerprint(b):
+    res = machine()
+    res['package_version'] = package_version(b)
+    return res
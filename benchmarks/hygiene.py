@@ -0,0 +1,95 @@
+"""Keep timings comparable over a long run.
+
+Background load, CPU frequency scaling and thermal throttling can make
+packages measured later in a run look slower than those measured first.
+This pins the process to one core, checks the CPU governor and load
+average, and repeatedly times a fixed NumPy workload (the reference)
+to detect when the machine itself has sped up or slowed down.
+"""
+
+import glob
+import os
+import subprocess
+
+import numpy as np
+
+import base
+
+# Relative change in the reference time counted as drift
+DRIFT_TOLERANCE = 0.1
+
+
+def pin(cpu):
+    """Run this process only on `cpu`. Returns whether that worked."""
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, [cpu])
+        return True
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.call(
+                ['taskset', '-p', '-c', str(cpu), str(os.getpid())],
+                stdout=devnull, stderr=devnull) == 0
+    except OSError:
+        # No taskset
+        return False
+
+
+def governors():
+    """The CPU frequency scaling governors in use (empty if unknown)."""
+    res = set()
+    for fname in glob.glob(
+            '/sys/devices/system/cpu/cpu*/cpufreq/scaling_governor'):
+        try:
+            with open(fname) as infile:
+                res.add(infile.read().strip())
+        except (IOError, OSError):
+            continue
+    return sorted(res)
+
+
+def loadavg():
+    """The load average over the last minute."""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return np.nan
+
+
+def check(max_load=1.0):
+    """Look for things that make timings noisy.
+
+    Returns the governors and load average, and a list of warnings.
+    """
+    state = {'governors': governors(), 'loadavg': loadavg()}
+    warnings = []
+    others = [g for g in state['governors'] if g != 'performance']
+    if len(others) > 0:
+        warnings.append("CPU governor is {}, not performance".format(
+            ', '.join(others)))
+    if state['loadavg'] > max_load:
+        warnings.append("Load average is {:.2f}".format(state['loadavg']))
+    return state, warnings
+
+
+def reference(reps=20, shape=(10000,)):
+    """Time a fixed NumPy workload, in ms (the best of `reps`)."""
+    np_obj = base.BenchNumpy()
+    x = np_obj.rand(shape)
+    y = np_obj.rand(shape)
+    return min(base.time_binary([x], [y], np_obj.binary_ufuncs)
+               for i in range(reps))
+
+
+class DriftMonitor(object):
+    """Compare the reference time with what it was at the start."""
+
+    def __init__(self, tolerance=DRIFT_TOLERANCE):
+        self.tolerance = tolerance
+        self.baseline = reference()
+
+    def drift(self):
+        """Relative change in the reference time since the start."""
+        return reference() / self.baseline - 1.0
+
+    def drifted(self, drift):
+        return abs(drift) > self.tolerance
@@ -134,6 +134,10 @@ def ap_eval(instr,vardict):
     ans=proc_stack(s,vardict)
     return ans
 
+# Set to False to skip dimension checks and dimension algebra; values are
+# still computed (in base units), but dims are no longer kept up to date.
+check_dims=True
+
 class DimensionsError(Exception):
     def __init__(self, value):
         self.value=value
@@ -180,7 +184,7 @@ class Q(object):
     def __add__(self, other):
         '''add like units together'''
         tmp=self.copy()
-        if other.dims==tmp.dims:
+        if not check_dims or other.dims==tmp.dims:
             tmp.value=self.value+other.value
             return tmp
         else:
@@ -188,7 +192,7 @@ class Q(object):
     # Rich comparison operators
     def __lt__(self, other):
         '''lt method for units'''
-        if self.dims!=other.dims:
+        if check_dims and self.dims!=other.dims:
             raise DimensionsError, 'Units not consistent'
         else:
             return self.value<other.value
@@ -197,7 +201,7 @@ class Q(object):
         return not self.__lt__(other)
     def __eq__(self, other):
         '''eq method for units'''
-        if self.dims!=other.dims:
+        if check_dims and self.dims!=other.dims:
             raise DimensionsError, 'Units not consistent'
         else:
             return self.value==other.value
@@ -206,7 +210,7 @@ class Q(object):
         return not self.__eq__(other)
     def __gt__(self, other):
         '''gt method for units'''
-        if self.dims!=other.dims:
+        if check_dims and self.dims!=other.dims:
             raise DimensionsError, 'Units not consistent'
         else:
             return self.value>other.value
@@ -216,7 +220,7 @@ class Q(object):
     def __sub__(self, other):
         '''subtract like units'''
         tmp=self.copy()
-        if other.dims==tmp.dims:
+        if not check_dims or other.dims==tmp.dims:
             tmp.value=self.value-other.value
             return tmp
         else:
@@ -227,6 +231,8 @@ class Q(object):
         try:
             tmp=Q(1,'')
             tmp.value=self.value*other.value
+            if not check_dims:
+                return tmp
             superset=dict.fromkeys(self.dims.keys()+other.dims.keys()).keys()
             for dim in superset:
                 tmp.dims[dim]=self.dims.get(dim,0)+ \
@@ -253,6 +259,8 @@ class Q(object):
         tmp=self.copy()
         try:    # if two Dim objects
             tmp.value=tmp.value/other.value
+            if not check_dims:
+                return tmp
             superset=dict.fromkeys(self.dims.keys()+other.dims.keys()).keys()
             for dim in superset:
                 tmp.dims[dim]=self.dims.get(dim,0)-other.dims.get(dim,0)
@@ -278,6 +286,9 @@ class Q(object):
         return other*tmp
     def __pow__(self,power):
         tmp=self.copy()
+        if not check_dims:
+            tmp.value=tmp.value**power
+            return tmp
         for dim in tmp.dims:
             newexponent=power*tmp.dims[dim]
             if abs(newexponent%1)<self.EXPTOL:
@@ -332,7 +343,7 @@ class Q(object):
     def __call__(self,otherdim, fmt=None):
         '''return value when expressed in otherdim dimensions'''
         o=Q(1,otherdim)
-        if self.dims==o.dims:
+        if not check_dims or self.dims==o.dims:
             if fmt==None:
                 return self.value/o.value
             else:
@@ -466,3 +477,13 @@ if __name__=='__main__':
     assert (+Q(5,'')==Q(5,''))
     assert (abs(Q(-5,''))==Q(5,''))
     assert (abs(Q(5,''))==Q(5,''))
+
+    # Without checks we get the same values, and mismatches pass silently
+    checked=[(T/ke).value, P.value, (D7**2).value, (T-Q(2,'mN*m')).value,
+             T<Q(2,'N*m'), P('W')]
+    check_dims=False
+    unchecked=[(T/ke).value, (T*vel).value, (D7**2).value,
+               (T-Q(2,'mN*m')).value, T<Q(2,'N*m'), P('W')]
+    assert(checked==unchecked)
+    assert((Q(2,'ft')+Q(3,'s')).value==Q(2,'ft').value+3)
+    check_dims=True
@@ -0,0 +1,224 @@
+"""Deferred evaluation of quantity expressions.
+
+Operations on lazy quantities build an expression graph instead of
+computing anything. `evaluate` checks the dimensions of the whole graph
+once, without touching the data, then computes the result in chunks
+that fit in cache. Each chunk of an intermediate result goes in a buffer
+that is reused once nothing else needs it, so no full-size temporaries
+are made and only the final result has a unit attached.
+
+Values and dimensions work as in `reference`: everything is in SI units,
+and `evaluate` returns a `reference.Quantity`.
+"""
+
+import numpy as np
+
+import reference
+from reference import DIMENSIONLESS, DimensionError
+
+# Elements per chunk; a few float64 buffers this size fit in L2 cache
+CHUNK_SIZE = 2 ** 14
+
+
+class Expr(object):
+    """A node in an expression graph."""
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if (method != '__call__' or len(kwargs) > 0
+                or ufunc not in reference.RULES):
+            return NotImplemented
+        return Op(ufunc, *inputs)
+
+    def __array__(self, dtype=None):
+        return np.asarray(evaluate(self), dtype=dtype)
+
+    def __str__(self):
+        return str(evaluate(self))
+
+    def __add__(self, other):
+        return Op(np.add, self, other)
+
+    def __radd__(self, other):
+        return Op(np.add, other, self)
+
+    def __sub__(self, other):
+        return Op(np.subtract, self, other)
+
+    def __rsub__(self, other):
+        return Op(np.subtract, other, self)
+
+    def __mul__(self, other):
+        return Op(np.multiply, self, other)
+
+    def __rmul__(self, other):
+        return Op(np.multiply, other, self)
+
+    def __div__(self, other):
+        return Op(np.true_divide, self, other)
+
+    def __rdiv__(self, other):
+        return Op(np.true_divide, other, self)
+
+    __truediv__ = __div__
+    __rtruediv__ = __rdiv__
+
+    def __pow__(self, other):
+        return Op(np.power, self, other)
+
+    def __lt__(self, other):
+        return Op(np.less, self, other)
+
+    def __le__(self, other):
+        return Op(np.less_equal, self, other)
+
+    def __gt__(self, other):
+        return Op(np.greater, self, other)
+
+    def __ge__(self, other):
+        return Op(np.greater_equal, self, other)
+
+    def __neg__(self):
+        return Op(np.negative, self)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Op(np.absolute, self)
+
+
+class Leaf(Expr):
+    """Data (in SI units) and its dimensions."""
+
+    def __init__(self, data, dims=DIMENSIONLESS):
+        self.data = data
+        self.dims = dims
+
+    def __repr__(self):
+        return 'Leaf(%s, %r)' % (
+            np.array2string(self.data), reference.format_dims(self.dims))
+
+
+class Op(Expr):
+    """A ufunc applied to other nodes."""
+
+    def __init__(self, ufunc, *args):
+        self.ufunc = ufunc
+        self.args = [as_expr(arg) for arg in args]
+
+    def __repr__(self):
+        return '%s(%s)' % (
+            self.ufunc.__name__, ', '.join(repr(arg) for arg in self.args))
+
+
+def as_expr(x):
+    if isinstance(x, Expr):
+        return x
+    if isinstance(x, reference.Quantity):
+        return Leaf(x.view(np.ndarray), x.known_dims())
+    return Leaf(np.asarray(x))
+
+
+def quantity(data, units=''):
+    """A lazy quantity holding `data` in `units`."""
+    return as_expr(reference.Quantity(data, units))
+
+
+def check(expr):
+    """Check the dimensions of a graph.
+
+    Returns the operations in the order they should be computed,
+    the leaves, the dimensions of every node (None for boolean results),
+    and how many times each node is used.
+    """
+    order, leaves, dims, uses = [], [], {}, {}
+
+    def visit(node):
+        if id(node) in dims:
+            uses[id(node)] += 1
+            return dims[id(node)]
+
+        if isinstance(node, Leaf):
+            d = node.dims
+            leaves.append(node)
+        else:
+            arg_dims = [visit(arg) for arg in node.args]
+            arg_dims = [DIMENSIONLESS if d is None else d for d in arg_dims]
+            if node.ufunc is np.power:
+                if not isinstance(node.args[1], Leaf):
+                    raise DimensionError("Exponent must be a constant")
+                d = reference.Quantity._power_dims(
+                    arg_dims, [None, node.args[1].data])
+            else:
+                d = reference.RULES[node.ufunc](*arg_dims)
+            order.append(node)
+        dims[id(node)] = d
+        uses[id(node)] = 1
+        return d
+
+    visit(expr)
+    return order, leaves, dims, uses
+
+
+def evaluate(expr, chunk_size=CHUNK_SIZE):
+    """Compute the value of `expr`; anything else is returned as is."""
+    if not isinstance(expr, Expr):
+        return expr
+    order, leaves, dims, uses = check(expr)
+
+    shape = ()
+    for leaf in leaves:
+        shape = np.broadcast(np.broadcast_to(0.0, shape), leaf.data).shape
+    size = int(np.prod(shape))
+
+    # Flatten every leaf to the full size, except for scalars
+    flat = {}
+    for leaf in leaves:
+        data = leaf.data
+        if data.ndim == 0:
+            flat[id(leaf)] = data
+        else:
+            flat[id(leaf)] = np.broadcast_to(data, shape).reshape(-1)
+
+    def dtype(node):
+        return np.bool_ if dims[id(node)] is None else np.float64
+
+    out = np.empty(size, dtype=dtype(expr))
+    if isinstance(expr, Leaf):
+        out[...] = flat[id(expr)]
+
+    # Free buffers, by dtype
+    pool = {np.bool_: [], np.float64: []}
+    for start in range(0, size, chunk_size):
+        stop = min(start + chunk_size, size)
+        n = stop - start
+        values = {}
+        remaining = dict(uses)
+
+        def value(node):
+            if isinstance(node, Leaf):
+                data = flat[id(node)]
+                return data if data.ndim == 0 else data[start:stop]
+            return values[id(node)][:n]
+
+        for node in order:
+            if node is expr:
+                buf = out[start:stop]
+            else:
+                free = pool[dtype(node)]
+                buf = free.pop() if free else np.empty(
+                    chunk_size, dtype=dtype(node))
+                values[id(node)] = buf
+            node.ufunc(*[value(arg) for arg in node.args], out=buf[:n])
+
+            for arg in node.args:
+                remaining[id(arg)] -= 1
+                if remaining[id(arg)] == 0 and id(arg) in values:
+                    pool[dtype(arg)].append(values.pop(id(arg)))
+
+    out = out.reshape(shape)
+    if dims[id(expr)] is None:
+        return out
+    out = out.view(reference.Quantity)
+    out.dims = dims[id(expr)]
+    return out
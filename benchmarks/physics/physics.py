@@ -31,6 +31,10 @@ except ImportError:
 class UnitError(ValueError):
     pass
 
+# Set to False to skip unit compatibility checks and unit algebra;
+# values are only scaled by the ratio of the unit factors.
+check_units = True
+
 # Adapted from ScientificPython:
 # Written by Konrad Hinsen <hinsen@cnrs-orleans.fr>
 # with contributions from Greg Ward
@@ -344,8 +348,11 @@ class PhysicalQuantity(object):
     def _sum(self, other, sign1, sign2):
         if not isPhysicalQuantity(other):
             raise UnitError('Incompatible types')
-        new_value = sign1 * self.value + \
-            sign2 * other.value * other.unit.conversion_factor_to(self.unit)
+        if check_units:
+            factor = other.unit.conversion_factor_to(self.unit)
+        else:
+            factor = other.unit.factor / self.unit.factor
+        new_value = sign1 * self.value + sign2 * other.value * factor
         return self.__class__(new_value, self.unit)
 
     def __add__(self, other):
@@ -367,6 +374,10 @@ class PhysicalQuantity(object):
         if not isPhysicalQuantity(other):
             return self.__class__(self.value * other, self.unit)
         value = self.value * other.value
+        if not check_units:
+            return self.__class__(value, PhysicalUnit(
+                self.unit.names, self.unit.factor * other.unit.factor,
+                self.unit.powers))
         unit = self.unit * other.unit
         if unit.is_dimensionless:
             return value * unit.factor
@@ -379,6 +390,10 @@ class PhysicalQuantity(object):
         if not isPhysicalQuantity(other):
             return self.__class__(self.value / other, self.unit)
         value = self.value / other.value
+        if not check_units:
+            return self.__class__(value, PhysicalUnit(
+                self.unit.names, self.unit.factor / other.unit.factor,
+                self.unit.powers))
         unit = self.unit / other.unit
         if unit.is_dimensionless:
             return value * unit.factor
@@ -401,6 +416,10 @@ class PhysicalQuantity(object):
     def __pow__(self, other):
         if isPhysicalQuantity(other):
             raise UnitError('Exponents must be dimensionless')
+        if not check_units:
+            return self.__class__(pow(self.value, other), PhysicalUnit(
+                self.unit.names, pow(self.unit.factor, other),
+                self.unit.powers))
         return self.__class__(pow(self.value, other), pow(self.unit, other))
 
     def __rpow__(self, other):
@@ -909,3 +928,22 @@ def load_ipython_extension(ip):
 
 def unload_ipython_extension(ip):
     ip.prefilter_manager.unregister_transformer(q_transformer)
+
+
+if __name__ == '__main__':
+    # Without checks we get the same values, and mismatches pass silently
+    d = Q(2, 'm')
+    t = Q(4, 's')
+    f = Q(3, 'kN')
+
+    def values():
+        results = [f * d, d / t, t / d, d ** 2, d + Q(50, 'cm'),
+                   d - Q(1, 'ft'), -d, abs(d)]
+        return ([(q.value, q.unit.factor) for q in results]
+                + [d < Q(3, 'm'), d == Q(200, 'cm')])
+    checked = values()
+    check_units = False
+    unchecked = values()
+    assert checked == unchecked
+    assert (d + t).value == d.value + t.value
+    check_units = True
@@ -0,0 +1,357 @@
+"""A minimal unit-tagged ndarray, as a lower bound on unit-tracking cost.
+
+Values are always stored in SI base units, so no operation ever has to
+convert; `to` converts back to any unit. Dimensions are a tuple of
+integer exponents of the SI base units, and each ufunc looks up the rule
+for its output dimensions in a table built once at import.
+
+Only ufuncs, views and copies know what the dimensions of their result
+are. Anything else NumPy makes from a quantity (e.g., with `np.dot`,
+`np.concatenate` or `np.linalg.solve`) has unknown dimensions, and
+ufuncs reject it, rather than guessing units that may be wrong.
+
+Requires NumPy >= 1.13 for ``__array_ufunc__``.
+"""
+
+import operator
+import re
+
+import numpy as np
+
+if np.lib.NumpyVersion(np.__version__) < '1.13.0':
+    raise ImportError("reference needs NumPy >= 1.13 for __array_ufunc__")
+
+BASE_UNITS = ('m', 'kg', 's', 'A', 'K', 'mol', 'cd')
+DIMENSIONLESS = (0,) * len(BASE_UNITS)
+
+
+class DimensionError(ValueError):
+    pass
+
+
+def _dims(**powers):
+    return tuple(powers.get(u, 0) for u in BASE_UNITS)
+
+
+# name: (scale to SI, dimensions)
+UNITS = {
+    '': (1.0, DIMENSIONLESS),
+    'm': (1.0, _dims(m=1)),
+    'g': (1e-3, _dims(kg=1)),
+    's': (1.0, _dims(s=1)),
+    'A': (1.0, _dims(A=1)),
+    'K': (1.0, _dims(K=1)),
+    'mol': (1.0, _dims(mol=1)),
+    'cd': (1.0, _dims(cd=1)),
+    'rad': (1.0, DIMENSIONLESS),
+    'sr': (1.0, DIMENSIONLESS),
+    'Hz': (1.0, _dims(s=-1)),
+    'N': (1.0, _dims(m=1, kg=1, s=-2)),
+    'Pa': (1.0, _dims(m=-1, kg=1, s=-2)),
+    'J': (1.0, _dims(m=2, kg=1, s=-2)),
+    'W': (1.0, _dims(m=2, kg=1, s=-3)),
+    'C': (1.0, _dims(s=1, A=1)),
+    'V': (1.0, _dims(m=2, kg=1, s=-3, A=-1)),
+    'ohm': (1.0, _dims(m=2, kg=1, s=-3, A=-2)),
+    'min': (60.0, _dims(s=1)),
+    'h': (3600.0, _dims(s=1)),
+    'inch': (0.0254, _dims(m=1)),
+    'ft': (0.3048, _dims(m=1)),
+    'mile': (1609.344, _dims(m=1)),
+}
+
+PREFIXES = {
+    'G': 1e9, 'M': 1e6, 'k': 1e3, 'h': 1e2, 'c': 1e-2, 'm': 1e-3,
+    'u': 1e-6, 'n': 1e-9, 'p': 1e-12,
+}
+
+_term = re.compile(r'\s*([*/]?)\s*([A-Za-z]\w*|1)(?:\s*\*\*\s*(-?\d+))?\s*')
+_parsed = {}
+
+
+def _lookup(name):
+    if name == '1':
+        return UNITS['']
+    if name in UNITS:
+        return UNITS[name]
+    if name[0] in PREFIXES and name[1:] in UNITS:
+        scale, dims = UNITS[name[1:]]
+        return PREFIXES[name[0]] * scale, dims
+    raise DimensionError("Unknown unit %r" % name)
+
+
+def parse(units):
+    """Return (scale, dims) for a string like 'kg*m/s**2'."""
+    if units in _parsed:
+        return _parsed[units]
+
+    scale, dims = 1.0, DIMENSIONLESS
+    pos = 0
+    while pos < len(units):
+        match = _term.match(units, pos)
+        if match is None or match.end() == pos:
+            raise DimensionError("Can't parse unit %r" % units)
+        pos = match.end()
+        op, name, power = match.groups()
+        power = int(power or 1)
+        if op == '/':
+            power = -power
+        s, d = _lookup(name)
+        scale *= s ** power
+        dims = tuple(x + y * power for x, y in zip(dims, d))
+
+    _parsed[units] = scale, dims
+    return scale, dims
+
+
+def format_dims(dims):
+    if dims is None:
+        return '?'
+    terms = []
+    for unit, power in zip(BASE_UNITS, dims):
+        if power == 1:
+            terms.append(unit)
+        elif power != 0:
+            terms.append('%s**%d' % (unit, power))
+    return '*'.join(terms)
+
+
+# Dimension rules. Each takes the dimensions of the inputs and returns the
+# dimensions of the output, or None if the output is a plain (e.g. bool) array.
+
+def _same(a, b=None):
+    if b is not None and a != b:
+        raise DimensionError("Dimensions %s and %s differ" % (
+            format_dims(a), format_dims(b)))
+    return a
+
+
+def _same_bool(a, b):
+    _same(a, b)
+    return None
+
+
+def _same_ratio(a, b):
+    _same(a, b)
+    return DIMENSIONLESS
+
+
+def _bool(*dims):
+    return None
+
+
+def _keep(a):
+    return a
+
+
+def _to_dimensionless(*dims):
+    return DIMENSIONLESS
+
+
+def _dimensionless(*dims):
+    for d in dims:
+        if d != DIMENSIONLESS:
+            raise DimensionError("Expected dimensionless, got %s" % (
+                format_dims(d)))
+    return DIMENSIONLESS
+
+
+def _mul(a, b):
+    return tuple(map(operator.add, a, b))
+
+
+def _div(a, b):
+    return tuple(map(operator.sub, a, b))
+
+
+def _square(a):
+    return tuple(x * 2 for x in a)
+
+
+def _sqrt(a):
+    if any(x % 2 for x in a):
+        raise DimensionError("Can't take sqrt of %s" % format_dims(a))
+    return tuple(x // 2 for x in a)
+
+
+def _reciprocal(a):
+    return tuple(-x for x in a)
+
+
+RULES = {}
+for _rule, _ufuncs in [
+        (_same, [np.add, np.subtract, np.maximum, np.minimum, np.fmax,
+                 np.fmin, np.remainder, np.fmod, np.hypot]),
+        (_same_bool, [np.greater, np.greater_equal, np.less, np.less_equal,
+                      np.not_equal, np.equal]),
+        (_same_ratio, [np.arctan2, np.floor_divide]),
+        (_bool, [np.isnan, np.isinf, np.isfinite, np.signbit]),
+        (_keep, [np.negative, np.positive, np.absolute, np.fabs, np.rint,
+                 np.conjugate, np.floor, np.ceil, np.trunc]),
+        (_to_dimensionless, [np.sign]),
+        (_dimensionless, [np.exp, np.exp2, np.log, np.log2, np.log10,
+                          np.expm1, np.log1p, np.logaddexp, np.logaddexp2,
+                          np.sin, np.cos, np.tan, np.arcsin, np.arccos,
+                          np.arctan, np.sinh, np.cosh, np.tanh, np.arcsinh,
+                          np.arccosh, np.arctanh, np.deg2rad, np.rad2deg]),
+        (_mul, [np.multiply]),
+        (_div, [np.divide, np.true_divide]),
+        (_square, [np.square]),
+        (_sqrt, [np.sqrt]),
+        (_reciprocal, [np.reciprocal])]:
+    for _ufunc in _ufuncs:
+        RULES[_ufunc] = _rule
+# matmul is a ufunc from NumPy 1.16
+if isinstance(getattr(np, 'matmul', None), np.ufunc):
+    RULES[np.matmul] = _mul
+# Powers depend on the exponent's value, so are handled separately
+RULES[np.power] = None
+
+# Rules that can be used to reduce, and the dimensions of the result
+# of reducing n values with the given dimensions
+REDUCIBLE = {
+    _same: lambda a, n: a,
+    _keep: lambda a, n: a,
+    _mul: lambda a, n: tuple(x * n for x in a),
+}
+
+
+def _reduced_length(shape, axis):
+    """How many values are reduced into each value of the result."""
+    if axis is None:
+        axis = range(len(shape))
+    elif not isinstance(axis, tuple):
+        axis = (axis,)
+    return int(np.prod([shape[a] for a in axis]))
+
+
+class Quantity(np.ndarray):
+    """An ndarray of SI values with integer dimension exponents.
+
+    Construction does not copy `data` if it is already a float array
+    and `units` are SI base units. If `data` is a quantity, its values
+    are already in SI units, so `units` must have the same dimensions.
+    """
+
+    def __new__(cls, data, units='', dtype=np.float64):
+        scale, dims = parse(units)
+        if isinstance(data, Quantity):
+            _same(data.known_dims(), dims)
+            scale = 1.0
+        if scale == 1.0:
+            obj = np.asarray(data, dtype=dtype).view(cls)
+        else:
+            # np.asarray, as the product of scalars is a NumPy scalar
+            obj = np.asarray(np.multiply(data, scale, dtype=dtype)).view(cls)
+        obj.dims = dims
+        return obj
+
+    def __array_finalize__(self, obj):
+        if isinstance(obj, Quantity) and np.may_share_memory(self, obj):
+            # A view (e.g., a slice or reshape)
+            self.dims = obj.dims
+        else:
+            # Made by NumPy outside __array_ufunc__ (e.g., by np.dot),
+            # or by the constructor or a copy, which set dims afterwards
+            self.dims = None
+
+    def known_dims(self):
+        """The dimensions; raises DimensionError if they're unknown."""
+        if self.dims is None:
+            raise DimensionError(
+                "Dimensions are unknown; NumPy made this without a ufunc")
+        return self.dims
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if ufunc not in RULES:
+            return NotImplemented
+        rule = RULES[ufunc]
+
+        dims = []
+        raw = []
+        for x in inputs:
+            if isinstance(x, Quantity):
+                dims.append(x.known_dims())
+                raw.append(x.view(np.ndarray))
+            else:
+                dims.append(DIMENSIONLESS)
+                raw.append(x)
+        if 'out' in kwargs:
+            kwargs['out'] = tuple(o.view(np.ndarray) if isinstance(
+                o, Quantity) else o for o in kwargs['out'])
+
+        if ufunc is np.power:
+            if method != '__call__':
+                return NotImplemented
+            out_dims = self._power_dims(dims, raw)
+        elif method == '__call__' or method == 'outer':
+            out_dims = rule(*dims)
+        elif method == 'at':
+            # ufunc.at(a, indices[, b]) works in place; indices have no units
+            if rule(dims[0], *dims[2:]) != dims[0]:
+                raise DimensionError("%s.at would change dimensions" % (
+                    ufunc.__name__))
+            out_dims = None
+        elif method == 'reduce' and rule in REDUCIBLE:
+            n = _reduced_length(np.shape(raw[0]), kwargs.get('axis', 0))
+            out_dims = REDUCIBLE[rule](dims[0], n)
+            if out_dims != dims[0] and 'where' in kwargs:
+                # How many values are reduced depends on `where`
+                return NotImplemented
+        elif rule in REDUCIBLE and REDUCIBLE[rule](dims[0], 2) == dims[0]:
+            # accumulate and reduceat give one result per number of values
+            out_dims = dims[0]
+        else:
+            return NotImplemented
+
+        result = getattr(ufunc, method)(*raw, **kwargs)
+        if out_dims is None or result is None:
+            return result
+        result = np.asarray(result).view(Quantity)
+        result.dims = out_dims
+        return result
+
+    @staticmethod
+    def _power_dims(dims, raw):
+        _dimensionless(dims[1])
+        if dims[0] == DIMENSIONLESS:
+            return DIMENSIONLESS
+        power = np.unique(raw[1])
+        if power.size != 1 or power[0] != int(power[0]):
+            raise DimensionError("Exponent must be a single integer")
+        return tuple(x * int(power[0]) for x in dims[0])
+
+    def to(self, units):
+        """Return the values (as an ndarray) in `units`."""
+        scale, dims = parse(units)
+        _same(self.known_dims(), dims)
+        return self.view(np.ndarray) / scale
+
+    @property
+    def units(self):
+        return format_dims(self.dims)
+
+    def __repr__(self):
+        return 'Quantity(%s, %r)' % (
+            np.array2string(self.view(np.ndarray)), self.units)
+
+    def __str__(self):
+        return '%s %s' % (self.view(np.ndarray), self.units)
+
+
+def _keeps_dims(method):
+    """Wrap an ndarray method that copies, so the copy keeps the dims."""
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if isinstance(result, Quantity):
+            result.dims = self.dims
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+# Methods that can make copies (e.g., fancy indexing), not just views
+for _name in ('__getitem__', '__copy__', '__deepcopy__', 'astype', 'copy',
+              'flatten', 'ravel', 'repeat', 'take'):
+    setattr(Quantity, _name, _keeps_dims(getattr(np.ndarray, _name)))
@@ -0,0 +1,104 @@
+"""Store every timing sample, for sweeps too big for nested JSON.
+
+Samples are kept in columns (package, op, shape, time and NumPy's time
+for the same call) and written in compressed ``.npz`` chunks of
+`chunk_size` rows to a directory, so memory use stays flat however many
+samples are taken. `load` reads them back as one DataFrame.
+
+The op is the key of the result that the sample went into (e.g.,
+'error_op_add' or 'registry_lookup_10000'), so every measurement has
+its own label.
+"""
+
+import glob
+import os
+
+import numpy as np
+
+# (column, dtype); strings are stored as fixed-width arrays
+COLUMNS = [('package', str),
+           ('op', str),
+           ('shape', str),
+           ('time', np.float64),
+           ('np_time', np.float64)]
+
+
+def shape_str(shape):
+    """'100x100' for (100, 100); '' for a scalar."""
+    if shape is None:
+        return ''
+    return 'x'.join(str(n) for n in shape)
+
+
+class SampleStore(object):
+    """Timing samples, one row per sample, written in chunks to `path`.
+
+    Chunks already in `path` (e.g., from an interrupted run) are kept.
+    """
+
+    def __init__(self, path, chunk_size=100000):
+        self.path = path
+        self.chunk_size = chunk_size
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.n_chunks = len(chunk_fnames(path))
+        self.columns = {name: [] for name, dtype in COLUMNS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+    def add(self, package, op, shape, time, np_time):
+        for name, value in [('package', package), ('op', op),
+                            ('shape', shape_str(shape)), ('time', time),
+                            ('np_time', np_time)]:
+            self.columns[name].append(value)
+        if len(self) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if len(self) == 0:
+            return
+        arrays = {name: np.asarray(self.columns[name], dtype=dtype)
+                  for name, dtype in COLUMNS}
+        np.savez_compressed(os.path.join(
+            self.path, 'chunk{:06d}.npz'.format(self.n_chunks)), **arrays)
+        self.n_chunks += 1
+        self.columns = {name: [] for name, dtype in COLUMNS}
+
+
+def chunk_fnames(path):
+    return sorted(glob.glob(os.path.join(path, 'chunk*.npz')))
+
+
+def load(path):
+    """All the samples in `path`, as a pandas DataFrame."""
+    import pandas as pd
+
+    frames = []
+    for fname in chunk_fnames(path):
+        data = np.load(fname)
+        try:
+            frames.append(pd.DataFrame(
+                {name: data[name] for name, dtype in COLUMNS}))
+        finally:
+            data.close()
+    if len(frames) == 0:
+        return pd.DataFrame(columns=[name for name, dtype in COLUMNS])
+
+    df = pd.concat(frames, ignore_index=True)
+    for name, dtype in COLUMNS:
+        if dtype is str:
+            df[name] = df[name].astype('category')
+    return df[[name for name, dtype in COLUMNS]]
+
+
+def summarize(df, stat='mean'):
+    """`stat` of the time of each (package, op and shape)."""
+    return df.pivot_table(index='package', columns=['op', 'shape'],
+                          values='time', aggfunc=stat)
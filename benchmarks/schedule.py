@@ -0,0 +1,225 @@
+"""Split a wall-clock budget across packages, timing functions and shapes.
+
+Rather than taking a fixed number of samples of everything, the scheduler
+takes a few pilot samples of each (package, timing function, shape) work
+unit, then keeps handing out samples to the unit where one more sample
+is worth the most: units that are noisy, cheap to sample, and close
+to a package they might swap ranks with.
+
+Optionally, units are sampled in a random order, and a reference
+workload is timed every few seconds (see `hygiene`). If the machine has
+sped up or slowed down since the start, the samples taken since the last
+check are thrown away, so they get taken again.
+"""
+
+import inspect
+import random
+import time
+
+import numpy as np
+
+import base
+
+
+class WorkUnit(object):
+    def __init__(self, bench, key, func, shape):
+        self.bench = bench
+        self.key = key
+        self.func = func
+        self.argspec = inspect.getargspec(func)
+        self.shape = shape
+        self.np_time = []
+        self.time = []
+        # Which drift check window each sample was taken in
+        self.window = []
+        self.failed = False
+        self.timed_out = False
+        self._stats = None
+
+    @property
+    def active(self):
+        return not (self.failed or self.timed_out)
+
+    @property
+    def n(self):
+        return len(self.time)
+
+    def sample(self, timeout, window=0):
+        try:
+            np_t, t = self.bench.sample_func(self.func, self.shape, self.argspec)
+        except Exception:
+            self.failed = True
+            return
+        self.np_time.append(np_t)
+        self.time.append(t)
+        self.window.append(window)
+        if self.bench.samples is not None:
+            self.bench.samples.add(
+                self.bench.name, self.key, self.shape, t, np_t)
+        self._stats = None
+        if t > timeout:
+            self.timed_out = True
+
+    def discard(self, window):
+        """Throw away the samples taken in `window`."""
+        keep = [i for i, w in enumerate(self.window) if w != window]
+        self.np_time = [self.np_time[i] for i in keep]
+        self.time = [self.time[i] for i in keep]
+        self.window = [self.window[i] for i in keep]
+        self._stats = None
+
+    def stats(self):
+        """Mean and variance of the trimmed samples."""
+        if self._stats is not None:
+            return self._stats
+        time = sorted(self.time)
+        np_time = sorted(self.np_time)
+
+        # Get rid of the top and bottom 2, as in BenchModule.time_func
+        if len(time) > 10:
+            time = time[2:-2]
+            np_time = np_time[2:-2]
+        self._stats = np.mean(time), np.var(time), np.mean(np_time)
+        return self._stats
+
+    def rel_err(self):
+        """Relative standard error of the mean."""
+        if self.n < 2:
+            return np.inf
+        mean, var, _ = self.stats()
+        return np.sqrt(var / self.n) / max(mean, 1e-9)
+
+
+class Scheduler(object):
+    def __init__(self, benches, budget, shapes=base.SHAPES, min_samples=5,
+                 batch_ms=10.0, timeout=2000.0, verbose=False,
+                 shuffle=False, drift=None, check_every=2.0):
+        self.benches = benches
+        self.budget = budget
+        self.min_samples = min_samples
+        self.batch_ms = batch_ms
+        self.timeout = timeout
+        self.verbose = verbose
+        self.shuffle = shuffle
+        # A hygiene.DriftMonitor, checked every `check_every` seconds
+        self.drift = drift
+        self.check_every = check_every
+        self.window = 0
+        # (seconds since the start, drift) for each check
+        self.drifts = []
+
+        self.units = []
+        self.competitors = {}
+        for b in benches:
+            for key, method in b.speed_funcs:
+                for shape in shapes:
+                    unit = WorkUnit(b, key, getattr(b, method), shape)
+                    self.units.append(unit)
+                    self.competitors.setdefault((key, shape), []).append(unit)
+
+    def priority(self, unit):
+        """Expected value of one more sample of `unit`, per ms spent."""
+        if unit.n < 2:
+            return np.inf
+        mean, var, _ = unit.stats()
+        rel_err = unit.rel_err()
+
+        # How many standard errors separate us from our nearest competitor?
+        z = np.inf
+        for other in self.competitors[unit.key, unit.shape]:
+            if other is unit or not other.active or other.n < 2:
+                continue
+            gap = abs(np.log(max(mean, 1e-9))
+                      - np.log(max(other.stats()[0], 1e-9)))
+            z = min(z, gap / np.hypot(rel_err, other.rel_err()))
+        if np.isinf(z):
+            # Nothing to rank against; just go by noise
+            z = 0.0
+
+        # One more sample shrinks the relative error by roughly rel_err / 2n
+        gain = rel_err / (2 * unit.n)
+        return gain / (1.0 + z) / max(mean, 1e-3)
+
+    def check_drift(self, start):
+        """Discard this window's samples if the machine has drifted."""
+        drift = self.drift.drift()
+        self.drifts.append((time.time() - start, drift))
+        if self.drift.drifted(drift):
+            if self.verbose:
+                print "Reference time drifted by {:.1%}; resampling".format(
+                    drift)
+            for unit in self.units:
+                unit.discard(self.window)
+        self.window += 1
+
+    def run(self):
+        start = time.time()
+        deadline = start + self.budget
+        next_check = start + self.check_every
+
+        # Pilot samples, interleaved so every unit gets something
+        for i in range(self.min_samples):
+            units = list(self.units)
+            if self.shuffle:
+                random.shuffle(units)
+            for unit in units:
+                if unit.active and time.time() < deadline:
+                    unit.sample(self.timeout, self.window)
+
+        while time.time() < deadline:
+            if self.drift is not None and time.time() >= next_check:
+                self.check_drift(start)
+                next_check = time.time() + self.check_every
+
+            active = [u for u in self.units if u.active]
+            if len(active) == 0:
+                break
+            if self.shuffle:
+                # Break ties (e.g., between unsampled units) at random
+                random.shuffle(active)
+            unit = max(active, key=self.priority)
+
+            # Sample cheap units in batches to amortize the bookkeeping
+            if unit.n == 0:
+                # All its samples were discarded
+                batch = 1
+            else:
+                batch = max(1, int(
+                    self.batch_ms / max(unit.stats()[0], 1e-3)))
+            for i in range(batch):
+                if unit.active and time.time() < deadline:
+                    unit.sample(self.timeout, self.window)
+
+        if self.drift is not None:
+            # Too late to resample, but the last window can still be flagged
+            self.drifts.append((time.time() - start, self.drift.drift()))
+
+        if self.verbose:
+            for unit in self.units:
+                print "{}.{}{}: {} samples".format(
+                    unit.bench.name, unit.key, unit.shape, unit.n)
+        return [self.summarize(b) for b in self.benches]
+
+    def summarize(self, b):
+        """Combine per-shape statistics into BenchModule.time() results."""
+        res = {}
+        for key, method in b.speed_funcs:
+            units = [u for u in self.units if u.bench is b and u.key == key]
+            if any(u.failed for u in units):
+                res[key] = {'mean': -1, 'std': -1, 'np_rel': -1}
+            elif any(u.timed_out for u in units):
+                res[key] = {'mean': 20.0, 'std': 20.0, 'np_rel': 20.0}
+            elif any(u.n == 0 for u in units):
+                # Budget ran out before this was sampled
+                res[key] = {'mean': np.nan, 'std': np.nan, 'np_rel': np.nan}
+            else:
+                stats = np.array([u.stats() for u in units])
+                means, variances, np_means = stats.T
+
+                # Weight every shape equally, like time_func does
+                std = np.sqrt(np.mean(variances) + np.var(means))
+                np_rel = np.sum(means) / np.sum(np_means)
+                res[key] = {'mean': np.mean(means),
+                            'std': std,
+                            'np_rel': min(np_rel, 20.0)}
+        return res
@@ -0,0 +1,124 @@
+"""Look for memory that keeps growing under a long, steady workload.
+
+`soak` runs a package's mixed workload (`BenchModule.soak_steps`) for a
+number of minutes, sampling the process's resident set size as it goes,
+and fits a line to find how fast memory grows once warmed up.
+
+To find what is growing, it snapshots allocations three times (after
+warming up, halfway, and at the end) and reports the sites that grew
+in both halves. These are allocation sites (file and line) if
+`tracemalloc` is available (Python 3.4+), or else object types,
+counted with `gc`.
+"""
+
+import gc
+import os
+import resource
+import time
+from collections import Counter
+
+import numpy as np
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def rss():
+    """Resident set size of this process, in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        # Peak, not current, RSS; kilobytes on Linux, bytes on OS X
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def snapshot(previous=()):
+    """Allocations by site, not counting `previous` snapshots."""
+    gc.collect()
+    if tracemalloc is not None:
+        return tracemalloc.take_snapshot()
+    ignore = set(id(s) for s in previous)
+    return Counter(type(o).__name__ for o in gc.get_objects()
+                   if id(o) not in ignore)
+
+
+def growth(before, after):
+    """{site: (bytes or objects added, count added)} for growing sites."""
+    if tracemalloc is not None:
+        return {str(stat.traceback): (stat.size_diff, stat.count_diff)
+                for stat in after.compare_to(before, 'lineno')
+                if stat.size_diff > 0}
+    return {name: (count, count)
+            for name, count in (after - before).items()}
+
+
+def soak(b, minutes, interval=1.0, warmup=0.2, top=10, verbose=False):
+    """Run the steps from `b.soak_steps()` for `minutes`, watching memory.
+
+    The first `warmup` fraction of the run is not used to fit growth.
+    """
+    if tracemalloc is not None:
+        tracemalloc.start()
+    try:
+        return _soak(b, minutes * 60.0, interval, warmup, top, verbose)
+    finally:
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+
+def _soak(b, duration, interval, warmup, top, verbose):
+    steps = b.soak_steps()
+    data = b.rand((100,))
+    start = time.time()
+    times, sizes = [], []
+    snapshots = []
+    checkpoints = [warmup, (1 + warmup) / 2.0, 1.0]
+    i = 0
+    next_sample = start
+
+    while True:
+        now = time.time()
+        elapsed = now - start
+        if now >= next_sample:
+            times.append(elapsed)
+            sizes.append(rss())
+            next_sample = now + interval
+        while len(snapshots) < len(checkpoints) and (
+                elapsed >= checkpoints[len(snapshots)] * duration):
+            snapshots.append(snapshot(snapshots))
+            if verbose:
+                print "{}: {} steps, {:.1f} MB".format(
+                    b.name, i, sizes[-1] / 1e6)
+        if elapsed >= duration:
+            break
+        for step in steps:
+            step(i, data)
+        i += 1
+
+    times = np.asarray(times)
+    sizes = np.asarray(sizes, dtype=float)
+    steady = times >= warmup * duration
+    if steady.sum() > 1:
+        slope = np.polyfit(times[steady], sizes[steady], 1)[0]
+    else:
+        slope = np.nan
+
+    # Sites that grew in both halves of the steady state
+    first = growth(snapshots[0], snapshots[1])
+    second = growth(snapshots[1], snapshots[2])
+    growing = sorted(((site, first[site][0] + second[site][0],
+                       first[site][1] + second[site][1])
+                      for site in first if site in second),
+                     key=lambda g: -g[1])
+
+    return {'steps': i,
+            'rss_start': sizes[0],
+            'rss_end': sizes[-1],
+            'rss_slope': slope,
+            'sites': 'lineno' if tracemalloc is not None else 'type',
+            'growing': growing[:top],
+            'samples': zip(times.tolist(), sizes.tolist())}
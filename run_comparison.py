@@ -1,18 +1,26 @@
 import benchmarks.bench_astropy
 import benchmarks.bench_dimensions
 import benchmarks.bench_dimpy
+import benchmarks.bench_lazy
 import benchmarks.bench_magnitude
 import benchmarks.bench_numericalunits
 import benchmarks.bench_physical_quantities
 import benchmarks.bench_pint
 import benchmarks.bench_piquant
 import benchmarks.bench_quantities
+import benchmarks.bench_reference
 import benchmarks.bench_scimath
 import benchmarks.bench_unum
+import benchmarks.hygiene
+import benchmarks.samples
+import benchmarks.schedule
+import benchmarks.soak
 import benchmarks as bm
 
 from pprint import pprint
 import json
+import os
+import random
 import warnings
 
 import numpy as np
@@ -21,82 +29,522 @@ import pandas as pd
 warnings.simplefilter('ignore')
 np.seterr(all='ignore')
 
+# Result keys made into one table per stat by process_pandas
+TABLE_KEYS = ('speed', 'cost', 'gc')
+# Speed stats that are times, in ms; see process_pandas
+TIME_STATS = ('mean', 'std', 'same_unit', 'overhead',
+              'p50', 'p90', 'p99', 'p999')
+
 CLASSES = (bm.bench_astropy.BenchAstropy,
            bm.bench_dimensions.BenchDimensions,
            bm.bench_dimpy.BenchDimpy,
+           bm.bench_lazy.BenchLazy,
            bm.bench_magnitude.BenchMagnitude,
            bm.bench_numericalunits.BenchNumericalunits,
            bm.bench_physical_quantities.BenchPhysicalQuantities,
            bm.bench_pint.BenchPint,
            bm.bench_piquant.BenchPiquant,
            bm.bench_quantities.BenchQuantities,
+           bm.bench_reference.BenchReference,
            bm.bench_scimath.BenchScimath,
            bm.bench_unum.BenchUnum,
            )
 
 
-def run_comparisons(classes=CLASSES):
-    for cls in classes:
-        print cls.__name__
-        yield bm.base.bench(cls)
+def checkpoint_fname(fname):
+    return fname + '.checkpoint'
+
+
+def load_checkpoint(fname):
+    """Read completed (class, suite) results from a checkpoint file."""
+    done = {}
+    if not os.path.exists(fname):
+        return done
+
+    with open(fname, 'r+') as infile:
+        data = infile.read()
+        # Cut off a partial line left by an interrupted run, so that
+        # records appended when resuming start on a line of their own
+        end = data.rfind('\n') + 1
+        if end < len(data):
+            infile.seek(end)
+            infile.truncate()
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # Mangled by an earlier run that appended to a partial line
+            continue
+        done[(record['class'], record['suite'])] = record
+    return done
+
+
+def save_checkpoint(record, outfile):
+    json.dump(record, outfile)
+    outfile.write('\n')
+    outfile.flush()
+    os.fsync(outfile.fileno())
+
+
+def run_comparisons(classes=CLASSES, suites=bm.base.SUITES,
+                    checkpoint=None, resume=False, budget=None,
+                    disable_gc=False, hygiene=False, sink=None, samples=None):
+    """Run the benchmark suites, yielding one result per class.
+
+    If `budget` (in seconds) is given, only the speed suite is run,
+    for all classes at once, by a scheduler that stops after `budget`
+    seconds; the other suites take a fixed number of samples, so they
+    would run past the budget.
+    If `disable_gc`, the garbage collector is off while suites run.
+
+    If `hygiene`, the (class, suite) pairs of all classes run
+    interleaved, in a random order, and the reference time (see
+    `hygiene`) is measured between them. Each record notes the CPU
+    governors, the load average, and the drift of the reference time
+    before and after each of its suites ran; records with a suite that
+    drifted are flagged. The scheduler interleaves its samples and
+    resamples anything measured while the reference time had drifted.
+    Results are then only yielded once everything has run.
+
+    Every record also stores how long this machine takes for
+    BenchNumpy.time()'s workload, for process_pandas to normalize.
+
+    If given, `sink(res, suite, value, gc_stats)` is called as soon as
+    each suite finishes (e.g., JSONLWriter.suite).
+    If `samples` is a directory, every timing sample is saved there
+    (see samples.SampleStore).
+    """
+    if budget is not None:
+        suites = [s for s in suites if s[0] == 'speed']
+    # E.g., under a budget, BenchLazy has no suites left to run
+    classes = [cls for cls in classes
+               if len(bm.base.class_suites(cls, suites)) > 0]
+    done = load_checkpoint(checkpoint) if checkpoint and resume else {}
+    calibration = bm.base.BenchNumpy().calibrate()
+    monitor = None
+    if hygiene:
+        monitor = bm.hygiene.DriftMonitor()
+        classes = random.sample(classes, len(classes))
+    outfile = None
+    if checkpoint is not None:
+        outfile = open(checkpoint, 'a' if resume else 'w')
+    store = None
+    if samples is not None:
+        store = bm.samples.SampleStore(samples)
+
+    def setup(cls):
+        """The bench object (None if all done), record and suites of `cls`.
+
+        Also returns the suites left for the scheduler.
+        """
+        cls_suites = bm.base.class_suites(cls, suites)
+        later = [s for s in cls_suites if budget is not None
+                 and s[0] == 'speed' and (cls.__name__, s[0]) not in done]
+        cls_suites = [s for s in cls_suites if s not in later]
+        if len(later) == 0 and all(
+                (cls.__name__, s[0]) in done for s in cls_suites):
+            return None, {}, cls_suites, later
+        b = cls(bm.base.BenchNumpy())
+        b.samples = store
+        res = bm.base.bench_header(b)
+        res['calibration'] = calibration
+        return b, res, cls_suites, later
+
+    def run_suite(cls, b, res, suite, value=None):
+        key = (cls.__name__, suite[0])
+        gc_stats = res.setdefault('gc', {})
+        if key in done:
+            res['name'] = done[key]['name']
+            res['facts'] = done[key]['facts']
+            res['fingerprint'] = done[key].get('fingerprint')
+            res['calibration'] = done[key].get('calibration')
+            value = done[key]['result']
+            if done[key].get('gc') is not None:
+                gc_stats[suite[0]] = done[key]['gc']
+        else:
+            if value is None:
+                value = bm.base.bench_suite(b, suite, gc_stats, disable_gc)
+            if outfile is not None:
+                save_checkpoint({'class': cls.__name__,
+                                 'suite': suite[0],
+                                 'name': res['name'],
+                                 'facts': res['facts'],
+                                 'fingerprint': res['fingerprint'],
+                                 'calibration': res['calibration'],
+                                 'result': value,
+                                 'gc': gc_stats.get(suite[0])}, outfile)
+        bm.base.merge_suite(res, suite, value)
+        if sink is not None:
+            sink(res, suite, value, gc_stats.get(suite[0]))
+
+    def hygiene_record(res):
+        if 'hygiene' not in res:
+            res['hygiene'] = {'governors': state['governors'],
+                              'loadavg': [state['loadavg']],
+                              'drift': {},
+                              'drifted': False}
+        return res['hygiene']
+
+    # (cls, b, res, later) for classes not yet yielded
+    pending = []
+    try:
+        if monitor is None:
+            for cls in classes:
+                print cls.__name__
+                b, res, cls_suites, later = setup(cls)
+                for suite in cls_suites:
+                    run_suite(cls, b, res, suite)
+                # Keep results in class order once anything has been deferred
+                if len(later) > 0 or len(pending) > 0:
+                    pending.append((cls, b, res, later))
+                else:
+                    yield res
+        else:
+            # Set up every class first, so that their suites can be mixed
+            pairs = []
+            for cls in classes:
+                b, res, cls_suites, later = setup(cls)
+                pending.append((cls, b, res, later))
+                pairs.extend((cls, b, res, suite) for suite in cls_suites)
+            random.shuffle(pairs)
+
+            state, warns = bm.hygiene.check()
+            for warning in warns:
+                print "Warning: " + warning
+            before = monitor.drift()
+            for cls, b, res, suite in pairs:
+                print cls.__name__, suite[0]
+                if (cls.__name__, suite[0]) in done:
+                    run_suite(cls, b, res, suite)
+                    continue
+                run_suite(cls, b, res, suite)
+                after = monitor.drift()
+                record = hygiene_record(res)
+                record['drift'][suite[0]] = [before, after]
+                record['loadavg'][1:] = [bm.hygiene.loadavg()]
+                if monitor.drifted(before) or monitor.drifted(after):
+                    print "Warning: reference time drifted by {:.1%}".format(
+                        after)
+                    record['drifted'] = True
+                before = after
+
+        if any(len(later) > 0 for cls, b, res, later in pending):
+            benches = [b for cls, b, res, later in pending if len(later) > 0]
+            scheduler = bm.schedule.Scheduler(
+                benches, budget, shuffle=hygiene, drift=monitor)
+            speeds = iter(scheduler.run())
+            for cls, b, res, later in pending:
+                for suite in later:
+                    run_suite(cls, b, res, suite, next(speeds))
+                if monitor is not None and len(later) > 0:
+                    record = hygiene_record(res)
+                    record['schedule_drift'] = scheduler.drifts
+                    record['loadavg'][1:] = [bm.hygiene.loadavg()]
+                    record['drifted'] |= monitor.drifted(
+                        scheduler.drifts[-1][1])
+        for cls, b, res, later in pending:
+            yield res
+    finally:
+        if outfile is not None:
+            outfile.close()
+        if store is not None:
+            store.flush()
+
+
+# Record keys that describe the package and run, rather than results
+HEADER_KEYS = ('name', 'facts', 'fingerprint', 'calibration')
+
+
+def measurement_rows(name, key, value, suite=None):
+    """One row per op (or other entry) in a result.
+
+    `key` is the result key (e.g., 'speed'), and `suite` the name
+    of the suite that measured it, if known.
+    """
+    if not isinstance(value, dict):
+        # E.g., the error message of a suite that failed
+        value = {None: value}
+    return [{'type': 'measurement', 'name': name, 'suite': suite,
+             'key': key, 'op': op, 'value': v}
+            for op, v in sorted(value.items())]
+
+
+def header_row(ires):
+    row = {key: ires.get(key) for key in HEADER_KEYS}
+    row['type'] = 'header'
+    return row
+
+
+def flatten(ires):
+    """Split a record into a header row and measurement rows."""
+    yield header_row(ires)
+    for key, value in sorted(ires.items()):
+        if key not in HEADER_KEYS:
+            for row in measurement_rows(ires['name'], key, value):
+                yield row
+
+
+def result_rows(res):
+    """Rows from records, rows (e.g., from read_jsonl), or a mix."""
+    for ires in res:
+        if 'type' in ires:
+            yield ires
+        else:
+            for row in flatten(ires):
+                yield row
+
+
+class JSONLWriter(object):
+    """Write results as JSON Lines as they're measured.
+
+    Each package gets a header row, then one row per op of each suite,
+    written and flushed as soon as the suite finishes.
+    """
+
+    def __init__(self, outfile):
+        self.outfile = outfile
+        self.headers = set()
+
+    def write(self, rows):
+        for row in rows:
+            json.dump(row, self.outfile)
+            self.outfile.write('\n')
+        self.outfile.flush()
+
+    def suite(self, res, suite, value, gc_stats=None):
+        rows = []
+        if res['name'] not in self.headers:
+            self.headers.add(res['name'])
+            rows.append(header_row(res))
+        name, method, key = suite
+        rows.extend(measurement_rows(res['name'], key, value, name))
+        if gc_stats is not None:
+            rows.extend(measurement_rows(
+                res['name'], 'gc', {name: gc_stats}, name))
+        self.write(rows)
+
+
+def read_jsonl(fname):
+    """Read rows written by JSONLWriter, one at a time."""
+    with open(fname) as infile:
+        for line in infile:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Partial line left by an interrupted run
+                continue
 
 
 def save_comparisons(res, fname=None):
     if fname is None:
         fname = 'results.json'
 
+    # Run everything before opening, so a crash doesn't clobber old results
+    res = list(res)
     with open(fname, 'w') as outfile:
-        json.dump(list(res), outfile, indent=2, separators=(',', ': '))
+        json.dump(res, outfile, indent=2, separators=(',', ': '))
 
 
-def get_comparisons(classes=CLASSES, fname=None):
-    res = run_comparisons(classes)
-    save_comparisons(res, fname)
+def get_comparisons(classes=CLASSES, fname=None, resume=False, budget=None,
+                    extra=(), disable_gc=False, hygiene=False,
+                    samples=None):
+    """Run and save the comparisons.
+
+    `extra` names suites from OPTIONAL_SUITES to run after the others.
+    If `fname` ends in .jsonl, results are written as they're measured
+    (see JSONLWriter) rather than all at the end.
+    """
+    if fname is None:
+        fname = 'results.json'
 
+    suites = bm.base.SUITES + [s for s in bm.base.OPTIONAL_SUITES
+                               if s[0] in extra]
+    kwargs = dict(checkpoint=checkpoint_fname(fname), resume=resume,
+                  budget=budget, disable_gc=disable_gc, hygiene=hygiene,
+                  samples=samples)
+    if not fname.endswith('.jsonl'):
+        save_comparisons(run_comparisons(classes, suites, **kwargs), fname)
+        return
 
-def process_pandas(res):
+    with open(fname, 'w') as outfile:
+        writer = JSONLWriter(outfile)
+        for ires in run_comparisons(classes, suites, sink=writer.suite,
+                                    **kwargs):
+            if 'hygiene' in ires:
+                writer.write(measurement_rows(
+                    ires['name'], 'hygiene', ires['hygiene']))
+
+
+def get_soak(classes=CLASSES, minutes=10.0, fname=None):
+    """Run a soak test of `minutes` on each package and save the results."""
+    if fname is None:
+        fname = 'soak.json'
+
+    res = []
+    for cls in classes:
+        print cls.__name__
+        b = cls(bm.base.BenchNumpy())
+        record = bm.base.bench_header(b)
+        record['soak'] = bm.soak.soak(b, minutes, verbose=True)
+        res.append(record)
+
+    with open(fname, 'w') as outfile:
+        json.dump(res, outfile, indent=2, separators=(',', ': '))
+
+
+def check_fingerprints(res, action='warn', machine=True):
+    """Look for results measured on different setups.
+
+    Results are compared if they have the same machine, Python and NumPy,
+    and the same version of each package. If not, `action` is 'warn'
+    (print a warning), 'raise' (raise ValueError) or 'ignore'.
+    If not `machine`, the hardware and OS don't have to match.
+    """
+    setups = {}
+    versions = {}
+    for ires in res:
+        if ires.get('name') is None:
+            # E.g., an empty record written by an older run
+            continue
+        fp = dict(ires.get('fingerprint') or {})
+        versions.setdefault(ires['name'], set()).add(
+            fp.pop('package_version', None))
+        if not machine:
+            for key in ('cpu', 'cores', 'memory', 'platform'):
+                fp.pop(key, None)
+        setups.setdefault(json.dumps(fp, sort_keys=True), []).append(
+            ires['name'])
+
+    problems = []
+    if len(setups) > 1:
+        problems.append("Results come from {} different setups: {}".format(
+            len(setups), '; '.join(', '.join(sorted(set(names)))
+                                   for names in setups.values())))
+    for name, version in sorted(versions.items()):
+        if len(version) > 1:
+            problems.append("Results for {} come from versions {}".format(
+                name, ', '.join(str(v) for v in sorted(version))))
+
+    for problem in problems:
+        if action == 'raise':
+            raise ValueError(problem)
+        elif action == 'warn':
+            print "Warning: " + problem
+
+
+def combine(values, failed=None):
+    """Combine results for one package from several records (runs).
+
+    `failed` says which values come from failed or timed-out timings;
+    these are left out, unless every record failed.
+    """
+    if failed is not None:
+        if all(failed):
+            return values[-1]
+        values = [v for v, f in zip(values, failed) if not f]
+    if len(values) == 1:
+        return values[0]
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool)
+           for v in values):
+        return float(np.mean(values))
+    return values[-1]
+
+
+def process_pandas(res, fingerprints='warn', normalize=False):
+    """Organize results into DataFrames.
+
+    `res` can be records (e.g., from results.json) or rows (e.g., from
+    read_jsonl); rows are read one at a time.
+    `fingerprints` is passed to check_fingerprints as `action`.
+
+    If `normalize`, timings from different machines are made comparable
+    by dividing them by each machine's speed factor: its calibration
+    time over the median calibration of all records. Failed and
+    timed-out timings are left alone. Timings and counts for the same
+    package from several records (runs) are averaged, leaving out
+    failed and timed-out timings unless every record has one.
+    """
+    headers = []
+    calibration = {}
     facts = {}
     syntax = {}
-    speed = {}
     compatibility = {}
+    # One (key, stat, op, name, value, calibration, failed) per stat,
+    # for pivoting
+    stats = []
 
-    for ires in res:
-        name = ires['name']
-        facts[name] = ires['facts']
-        syntax[name] = ires['syntax']
-
-        # We want to transpose the speed dict so it is organized
-        # by operation type rather than measurement.
-        # With pandas 1.4 we should be ablle to add error bars as well.
-        for key, value in ires['speed'].items():
-            for key1, value1 in value.items():
-                if key1 not in speed:
-                    speed[key1] = {}
-                if key not in speed[key1]:
-                    speed[key1][key] = {}
-                speed[key1][key][name] = value1
-
-        for key, value in ires['compatibility'].items():
-            if key not in compatibility:
-                compatibility[key] = {}
-            compatibility[key][name] = value
+    for row in result_rows(res):
+        name = row['name']
+        if name is None:
+            # E.g., an empty record written by an older run
+            continue
+        if row['type'] == 'header':
+            headers.append(row)
+            facts[name] = row['facts']
+            calibration[name] = row.get('calibration')
+            continue
+
+        key, op, value = row['key'], row['op'], row['value']
+        if op is None:
+            # A suite that failed
+            continue
+        if key == 'syntax':
+            syntax.setdefault(name, {})[op] = value
+        elif key == 'compatibility':
+            compatibility.setdefault(op, {})[name] = value
+        elif key in TABLE_KEYS and isinstance(value, dict):
+            timing = tuple(value.get(k) for k in ('mean', 'std', 'np_rel'))
+            timed = key == 'speed' and bm.base.timed_ok(timing)
+            # A timing, but a failed or timed-out one
+            failed = key == 'speed' and 'mean' in value and not timed
+            for stat, v in value.items():
+                scale = timed and stat in TIME_STATS
+                stats.append((key, stat, op, name, v,
+                              calibration.get(name) if scale else None,
+                              failed))
+
+    check_fingerprints(headers, fingerprints, machine=not normalize)
+    stats = pd.DataFrame.from_records(stats, columns=[
+        'key', 'stat', 'op', 'name', 'value', 'calibration', 'failed'])
+    if normalize:
+        calibrations = [h.get('calibration') for h in headers]
+        if any(c is None for c in calibrations):
+            raise ValueError("Can't normalize results without calibration")
+        scale = stats['calibration'].notnull()
+        factor = stats.loc[scale, 'calibration'] / np.median(calibrations)
+        stats.loc[scale, 'value'] = stats.loc[scale, 'value'] / factor
+
+    # We want to transpose the speed dict so it is organized
+    # by operation type rather than measurement.
+    # With pandas 1.4 we should be ablle to add error bars as well.
+    tables = {key: {} for key in TABLE_KEYS}
+    for (key, stat), group in stats.groupby(['key', 'stat']):
+        combined = [(index, combine(list(g['value']), list(g['failed'])))
+                    for index, g in group.groupby(['name', 'op'])]
+        table = pd.Series(
+            [value for index, value in combined],
+            index=pd.MultiIndex.from_tuples(
+                [index for index, value in combined], names=['name', 'op']),
+        ).unstack('op')
+        table.index.name = table.columns.name = None
+        table = table.infer_objects()
+        tables[key][stat] = table.sort_index(axis=0).sort_index(axis=1)
 
     facts = pd.DataFrame.from_dict(facts, orient='index')
     syntax = pd.DataFrame.from_dict(syntax, orient='index')
 
-    facts = facts.sort(axis=0).sort(axis=1)
-    syntax = syntax.sort(axis=0).sort(axis=1)
+    facts = facts.sort_index(axis=0).sort_index(axis=1)
+    syntax = syntax.sort_index(axis=0).sort_index(axis=1)
 
-    for key, value in speed.items():
-        value = pd.DataFrame.from_dict(value, orient='columns')
-        speed[key] = value.sort(axis=0).sort(axis=1)
     for key, value in compatibility.items():
         value = pd.DataFrame.from_dict(value, orient='index')
-        compatibility[key] = value.sort(axis=0).sort(axis=1)
+        compatibility[key] = value.sort_index(axis=0).sort_index(axis=1)
 
     resdict = {'facts': facts,
                'syntax': syntax,
-               'speed': speed,
+               'speed': tables['speed'],
+               'cost': tables['cost'],
+               'gc': tables['gc'],
                'compatibility': compatibility}
 
     return resdict
@@ -108,4 +556,45 @@ def get_pandas(classes=CLASSES):
 
 
 if __name__ == "__main__":
-    get_comparisons()
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Compare Python quantities packages.")
+    parser.add_argument('--fname', default='results.json',
+                        help="Where to save results (default: %(default)s); "
+                        "a .jsonl file is written as results come in")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip (package, suite) results already saved "
+                        "in the checkpoint file of a previous run")
+    parser.add_argument('--budget', type=float, default=None,
+                        help="Wall-clock budget in seconds, shared across "
+                        "all packages; only the speed suite is run")
+    parser.add_argument('--extra', action='append', default=[],
+                        choices=[s[0] for s in bm.base.OPTIONAL_SUITES],
+                        help="Also run this optional suite (can be repeated)")
+    parser.add_argument('--no-gc', action='store_true',
+                        help="Disable the garbage collector while suites "
+                        "run, to see how much time it accounts for")
+    parser.add_argument('--hygiene', action='store_true',
+                        help="Run the suites of all packages interleaved "
+                        "in a random order, check the CPU governor and "
+                        "load, and flag "
+                        "(or with --budget, resample) timings taken "
+                        "while the machine's speed drifted")
+    parser.add_argument('--pin', type=int, default=None, metavar='CPU',
+                        help="Run only on core CPU")
+    parser.add_argument('--samples', default=None, metavar='DIR',
+                        help="Also save every timing sample, in compressed "
+                        "chunks in DIR (see benchmarks/samples.py)")
+    parser.add_argument('--soak', type=float, default=None, metavar='MINUTES',
+                        help="Instead of the comparison, run a soak test "
+                        "of MINUTES per package and save it to soak.json")
+    args = parser.parse_args()
+    if args.pin is not None and not bm.hygiene.pin(args.pin):
+        print "Warning: couldn't pin to CPU {}".format(args.pin)
+    if args.soak is not None:
+        get_soak(minutes=args.soak)
+    else:
+        get_comparisons(fname=args.fname, resume=args.resume,
+                        budget=args.budget, extra=args.extra,
+                        disable_gc=args.no_gc, hygiene=args.hygiene,
+                        samples=args.samples)